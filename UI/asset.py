@@ -1,26 +1,32 @@
+import numpy as np
+import pandas as pd
+
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QRadioButton, QButtonGroup, QLineEdit, QPushButton, \
     QHBoxLayout
 
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-
 from logic.config import config
+from logic.figures import FigureWidget
+from logic.quotes import quotes
+from logic.sqlite_connector import sqlite
 from logic.navigation import Window
+from logic.prefetch import prefetcher
 from logic.asset import Asset
+from logic.symbols import symbols
+from UI.completer import SymbolCompleter
 
 
-class ChartWidget(QWidget):
+class ChartWidget(FigureWidget):
     """Create widget with a chart of an asset."""
 
     def __init__(self, asset_abbr):
-        super().__init__()
+        # load the asset first so no figure is taken from the pool if it is not found
+        asset = Asset(asset_abbr)
 
-        self.asset = Asset(asset_abbr)
+        # get the matplotlib figure and canvas
+        super().__init__(figsize=(10, 6))
 
-        # create the matplotlib figure and canvas
-        self.figure, self.ax = plt.subplots(figsize=(10, 6))
-        self.canvas = FigureCanvas(self.figure)
+        self.asset = asset
 
         # create a layout for this widget
         layout = QVBoxLayout()
@@ -28,8 +34,39 @@ class ChartWidget(QWidget):
         self.setLayout(layout)
 
         # fetch asset data and plot
+        self.line = None
+        self.x = self.y = None
         self.plot_asset_data()
 
+        quotes.subscribe([self.asset], self.update_with_quotes)
+
+    def release(self) -> None:
+        quotes.unsubscribe(self.update_with_quotes)
+        prefetcher.cancel([self.asset])
+        super().release()
+
+    def update_with_quotes(self, assets) -> None:
+        """Move the last point of the chart to the newest price or add a point after it."""
+        if self.line is None or not len(self.x) or self.asset.quote_time is None:
+            return
+
+        price = float(self.asset.data.get_column('Close')[-1])
+        spacing = self.x[-1] - self.x[-2] if len(self.x) > 1 else pd.Timedelta(days=1)
+        # bars of a day or longer show the quote on its day, intraday bars at the time of the quote
+        when = self.asset.data.last_date() if spacing >= pd.Timedelta(days=1) else self.asset.quote_time
+        if when < self.x[-1]:
+            return
+        if when - self.x[-1] < spacing:
+            self.y[-1] = price
+        else:
+            self.x = self.x.append(pd.DatetimeIndex([when]))
+            self.y = np.append(self.y, price)
+
+        self.line.set_data(self.x, self.y)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.canvas.draw_idle()
+
     def plot_asset_data(self):
         """Plot asset chart."""
 
@@ -37,7 +74,7 @@ class ChartWidget(QWidget):
         self.ax.clear()
 
         # create plot
-        self.create_plot(self.asset.history)
+        self.create_plot(self.asset.get_data_in_period(config['TIME_PERIODS']['Max']))
 
     def refresh_with_new_period(self, period):
         """Refresh plot with new period."""
@@ -47,7 +84,9 @@ class ChartWidget(QWidget):
     def create_plot(self, data):
         """Create plot."""
         # create plot
-        self.ax.plot(data.index, data['Close'], label=f'{self.asset.short_name} Close Price', color='green')
+        self.x = data.index
+        self.y = np.array(data['Close'], dtype=float)
+        self.line, = self.ax.plot(self.x, self.y, label=f'{self.asset.short_name} Close Price', color='green')
         self.ax.set_title(f'{self.asset.short_name} Asset Price', color='gray')
         self.ax.set_xlabel('Date', color='gray')
         self.ax.set_ylabel('Price (USD)', color='gray')
@@ -94,6 +133,7 @@ class AssetDetailsWindow(Window):
         """Create and add textbox and button for searches."""
         self.textbox = QLineEdit()
         self.textbox.setPlaceholderText('Enter asset abbreviation')
+        SymbolCompleter(self.textbox)
 
         self.button = QPushButton('Search')
         self.button.clicked.connect(self.display_asset) # will add the chart if search is successful
@@ -107,17 +147,29 @@ class AssetDetailsWindow(Window):
         # remove old chart and buttons if there was a previous search
         if self.plot:
             self.main_layout.removeWidget(self.plot)
+            self.plot.release()
+            self.plot.deleteLater()
+            self.plot = None
             self.remove_time_period_buttons()
 
+        # unknown symbols are rejected without asking yfinance
+        abbrev = symbols.resolve(self.textbox.text())
+        if abbrev is None:
+            self.textbox.clear()
+            self.textbox.setPlaceholderText('Unknown symbol')
+            return
+
         # if an unexpected error occurs
         try:
-            self.plot = ChartWidget(self.textbox.text())
+            self.plot = ChartWidget(abbrev)
         except Exception as e:
             self.textbox.clear()
             self.textbox.setPlaceholderText('No asset found')
             print(e)
             return
 
+        sqlite.record_usage(abbrev, 'search')
+
         # add chart to window
         self.main_layout.addWidget(self.plot)
 
@@ -151,5 +203,7 @@ class AssetDetailsWindow(Window):
     def remove_time_period_buttons(self):
         """Remove radio buttons for time period."""
         self.main_layout.removeItem(self.layout_period_buttons)
+        while self.layout_period_buttons.count():
+            self.layout_period_buttons.takeAt(0).widget().deleteLater()
         self.button_group = None
         self.layout_period_buttons = None
@@ -0,0 +1,41 @@
+from PyQt6.QtCore import QStringListModel, QTimer
+from PyQt6.QtWidgets import QCompleter, QLineEdit
+
+from logic.config import config
+from logic.prefetch import prefetcher
+from logic.symbols import symbols
+
+
+class SymbolCompleter(QCompleter):
+    """Suggest known symbols while a search box is edited.
+
+    Matching is done by the symbol directory, which also finds symbols by the name of the company and
+    with a typo, so the completer shows its results unfiltered. Once typing pauses the best suggestions
+    are downloaded in the background, so they are usually stored by the time the search is confirmed.
+    """
+
+    def __init__(self, textbox: QLineEdit):
+        self.model = QStringListModel()
+        super().__init__(self.model, textbox)
+
+        self.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        textbox.setCompleter(self)
+        textbox.textEdited.connect(self.update_suggestions)
+
+        self.suggestions = []
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(config['PREFETCH_DEBOUNCE'])
+        self.prefetch_timer.timeout.connect(self.prefetch_suggestions)
+
+    def update_suggestions(self, text: str) -> None:
+        self.suggestions = symbols.search(text)
+        self.model.setStringList([symbols.describe(abbrev) for abbrev in self.suggestions])
+        self.prefetch_timer.start()
+
+    def prefetch_suggestions(self) -> None:
+        prefetcher.request(self.suggestions[:config['PREFETCH_SUGGESTIONS']], urgent=True)
+
+    def pathFromIndex(self, index):
+        # only the symbol is put in the search box
+        return index.data().split(' - ')[0]
@@ -0,0 +1,133 @@
+import numpy as np
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QEvent, pyqtSignal
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyleOptionButton, QStyle, QApplication
+
+from logic.asset import Asset
+from logic.portfolio import Portfolio
+
+
+class HoldingsModel(QAbstractTableModel):
+    """Table model bound to the holdings of a portfolio.
+
+    Rows follow the order of the assets in the portfolio. Prices, values and weights are recalculated
+    as arrays when the holdings change and the view is only told which rows and columns changed.
+    """
+
+    COLUMNS = ['Asset', 'Shares', 'Last Price', 'Value', 'Weight', '', '']
+    PERIODIC_COLUMN = 5
+    REMOVE_COLUMN = 6
+
+    def __init__(self, portfolio: Portfolio):
+        super().__init__()
+
+        self.portfolio = portfolio
+        self.assets = []
+        self.names = []
+
+        self.shares = np.empty(0)
+        self.prices = np.empty(0)
+        self.values = np.empty(0)
+        self.weights = np.empty(0)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.assets)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        row = index.row()
+        match index.column():
+            case 0:
+                return self.names[row]
+            case 1:
+                return f'{self.shares[row]:g}'
+            case 2:
+                return f'{self.prices[row]:.2f}'
+            case 3:
+                return f'{self.values[row]:.2f}'
+            case 4:
+                return f'{self.weights[row] * 100:.1f} %'
+            case self.PERIODIC_COLUMN:
+                return 'Set Periodical Buying'
+            case self.REMOVE_COLUMN:
+                return 'Remove'
+
+    def asset_updated(self, asset: Asset) -> None:
+        """Show an asset that was added to the portfolio or whose shares changed."""
+        row = self.row_of(asset)
+        if row is None:
+            self.beginInsertRows(QModelIndex(), len(self.assets), len(self.assets))
+            self.assets.append(asset)
+            self.names.append(str(asset))
+            self.refresh_values()
+            self.endInsertRows()
+        else:
+            self.refresh_values()
+            self.dataChanged.emit(self.index(row, 1), self.index(row, 3))
+
+        # weights of every asset change with the total value
+        self.dataChanged.emit(self.index(0, 4), self.index(len(self.assets) - 1, 4))
+
+    def asset_removed(self, asset: Asset) -> None:
+        """Remove an asset from the portfolio and its row from the table."""
+        row = self.row_of(asset)
+        if row is None:
+            return
+
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.portfolio.remove_asset(asset)
+        del self.assets[row]
+        del self.names[row]
+        self.refresh_values()
+        self.endRemoveRows()
+
+        if self.assets:
+            self.dataChanged.emit(self.index(0, 4), self.index(len(self.assets) - 1, 4))
+
+    def prices_updated(self) -> None:
+        """Show new prices of all assets."""
+        self.refresh_values()
+        if self.assets:
+            self.dataChanged.emit(self.index(0, 2), self.index(len(self.assets) - 1, 4))
+
+    def row_of(self, asset: Asset) -> int | None:
+        for row, held_asset in enumerate(self.assets):
+            if held_asset.abbrev == asset.abbrev:
+                return row
+        return None
+
+    def refresh_values(self) -> None:
+        curve = self.portfolio.equity_curve
+        self.shares = curve.shares
+        self.prices = curve.last_prices()
+        self.values = self.shares * self.prices
+        self.weights = self.portfolio.get_weights()
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """Draw a push button in every cell of a column without creating a widget per row."""
+
+    clicked = pyqtSignal(int)
+
+    def paint(self, painter, option, index):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(2, 2, -2, -2)
+        button.text = index.data()
+        button.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+        QApplication.style().drawControl(QStyle.ControlElement.CE_PushButton, button, painter)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.Type.MouseButtonRelease and option.rect.contains(event.position().toPoint()):
+            self.clicked.emit(index.row())
+            return True
+        return False
@@ -4,6 +4,7 @@ from UI.asset import AssetDetailsWindow
 from UI.portfolio import PortfolioWindow
 from logic.config import config
 from logic.navigation import Window
+from logic.prefetch import prefetch_at_startup
 
 
 class MainMenu(Window):
@@ -28,6 +29,9 @@ class MainMenu(Window):
         self.menu_bar = None
         self.create_menu()
 
+        # download what is likely to be opened while the user picks a window
+        prefetch_at_startup()
+
     def create_menu(self):
         """Manage menu."""
 
@@ -1,21 +1,26 @@
 import pandas as pd
 
-from PyQt6.QtCore import Qt
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, QHBoxLayout,
-                             QHeaderView, QGroupBox, QTextEdit, QDialog, QLabel, QScrollArea)
-
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QLineEdit, QPushButton, QTableView, QHBoxLayout, QHeaderView,
+                             QGroupBox, QTextEdit, QDialog, QLabel, QScrollArea, QCheckBox)
 
 from numpy import ndarray
+from numpy.linalg import LinAlgError
 
 from logic.config import config
+from logic.figures import FigureWidget
 from logic.navigation import Window
 from logic.asset import Asset
 from logic.portfolio import Portfolio
+from logic.prefetch import prefetcher
+from logic.quotes import quotes
+from logic.sqlite_connector import sqlite
+from logic.symbols import symbols
+from UI.completer import SymbolCompleter
+from UI.holdings import HoldingsModel, ButtonDelegate
 
 
-class PortfolioChart(QWidget):
+class PortfolioChart(FigureWidget):
     """Pie chart for portfolio."""
 
     def __init__(self, portfolio: Portfolio):
@@ -25,10 +30,6 @@ class PortfolioChart(QWidget):
 
         self.setMaximumSize(self.geometry().width() - 200, self.geometry().height() - 200)
 
-        # create the matplotlib figure and canvas
-        self.figure, self.ax = plt.subplots()
-        self.canvas = FigureCanvas(self.figure)
-
         # create a layout for this widget
         layout = QVBoxLayout()
         layout.addWidget(self.canvas)
@@ -55,6 +56,39 @@ class PortfolioChart(QWidget):
         self.draw_chart()
 
 
+class FrontierChart(FigureWidget):
+    """Efficient frontier with the current and the optimized portfolios."""
+
+    def __init__(self):
+        super().__init__()
+
+        # create a layout for this widget
+        layout = QVBoxLayout()
+        layout.addWidget(self.canvas)
+        self.setLayout(layout)
+
+    def draw_chart(self, results: dict) -> None:
+        self.ax.clear()
+
+        self.ax.plot(results['frontier_volatility'] * 100, results['frontier_returns'] * 100,
+                     label='Efficient Frontier', color='green')
+        for name, color in (('current', 'gray'), ('min_variance_stats', 'blue'), ('max_sharpe_stats', 'red')):
+            returns, volatility, _ = results[name]
+            self.ax.scatter(volatility * 100, returns * 100, color=color,
+                            label=name.removesuffix('_stats').replace('_', ' ').title())
+
+        self.ax.set_title('Efficient Frontier', color='gray')
+        self.ax.set_xlabel('Volatility (%)', color='gray')
+        self.ax.set_ylabel('Expected Return (%)', color='gray')
+        self.ax.tick_params(axis='both', colors='gray')
+        self.ax.legend()
+
+        bg_color = self.palette().color(self.backgroundRole()).name()
+        self.figure.set_facecolor(bg_color)
+        self.ax.set_facecolor(bg_color)
+        self.canvas.draw()
+
+
 class PortfolioWindow(Window):
     """Create window with simulated portfolio."""
 
@@ -85,15 +119,31 @@ class PortfolioWindow(Window):
 
         # plot pie chart
         self.chart = PortfolioChart(self.portfolio)
-        self.table = QTableWidget()
+        self.holdings = HoldingsModel(self.portfolio)
+        self.add_holdings_table()
         self.asset_layout = QHBoxLayout()
         self.asset_layout.addWidget(self.chart) # only to look better
         self.asset_layout.addWidget(self.table) # same as ^
         self.main_layout.addLayout(self.asset_layout)
 
+        # add metrics of the daily portfolio value
+        self.performance_area = None
+        self.overlap_area = None
+        self.add_performance_widgets()
+
+        # several changes of holdings in a row redraw the chart and metrics once
+        self.redraw_timer = QTimer(self)
+        self.redraw_timer.setSingleShot(True)
+        self.redraw_timer.setInterval(config['HOLDINGS_REDRAW_DELAY'])
+        self.redraw_timer.timeout.connect(self.holdings_changed)
+
         # add testing with historical data
         self.textbox_begin_date = None
         self.textbox_end_date = None
+        self.textbox_frequency = None
+        self.textbox_threshold = None
+        self.textbox_cost = None
+        self.textbox_fixed_cost = None
         self.results_area = None
         self.periodic_assets = {}
         self.add_historical_testing_widgets()
@@ -101,14 +151,29 @@ class PortfolioWindow(Window):
         # add testing with monte carlo
         self.textbox_period = None
         self.textbox_simulations = None
+        self.textbox_block = None
+        self.checkbox_stationary = None
         self.add_monte_carlo_widgets()
 
+        # add stress tests
+        self.textbox_shocks = None
+        self.stress_area = None
+        self.add_stress_test_widgets()
+
+        # add optimization of weights
+        self.checkbox_long_only = None
+        self.checkbox_shrinkage = None
+        self.frontier_chart = None
+        self.optimization_area = None
+        self.add_optimization_widgets()
+
         self.show()
 
     def add_search_widgets(self):
         """Create and add textbox and button for searches."""
         self.textbox_name = QLineEdit('AAPL')
         self.textbox_name.setPlaceholderText('Enter asset abbreviation')
+        SymbolCompleter(self.textbox_name)
 
         self.textbox_percentage = QLineEdit('2')
         self.textbox_percentage.setPlaceholderText('Enter shares')
@@ -124,9 +189,16 @@ class PortfolioWindow(Window):
 
     def add_to_portfolio(self):
         """Add asset to portfolio if it is found."""
+        # unknown symbols are rejected without asking yfinance
+        abbrev = symbols.resolve(self.textbox_name.text())
+        if abbrev is None:
+            self.textbox_name.clear()
+            self.textbox_name.setPlaceholderText('Unknown symbol')
+            return
+
         # if an unexpected error occurs
         try:
-            self.portfolio.add_asset(self.textbox_name.text(), float(self.textbox_percentage.text()))
+            asset = self.portfolio.add_asset(abbrev, float(self.textbox_percentage.text()))
         except Exception:
             self.textbox_name.clear()
             self.textbox_percentage.clear()
@@ -134,57 +206,64 @@ class PortfolioWindow(Window):
             self.textbox_percentage.setPlaceholderText('Error')
             return
 
-        self.reload_chart()
-        self.reload_table()
-
-    def reload_table(self):
-        # remove old table
-        self.asset_layout.removeWidget(self.table)
-        self.table = QTableWidget()
+        sqlite.record_usage(abbrev, 'portfolio')
+        self.holdings.asset_updated(asset)
+        self.redraw_timer.start()
+        self.subscribe_to_quotes()
+
+    def subscribe_to_quotes(self):
+        """Receive live quotes of the assets in the portfolio."""
+        if self.portfolio.get_assets():
+            quotes.subscribe(self.portfolio.get_assets(), self.update_with_quotes)
+        else:
+            quotes.unsubscribe(self.update_with_quotes)
+
+    def update_with_quotes(self, assets):
+        """Update the value of the portfolio with new prices."""
+        self.portfolio.equity_curve.update_last_day()
+        self.holdings.prices_updated()
+
+    def close_window(self) -> None:
+        quotes.unsubscribe(self.update_with_quotes)
+        prefetcher.cancel(self.portfolio.get_assets())
+        self.redraw_timer.stop()
+        super().close_window()
+
+    def add_holdings_table(self):
+        """Create the table of holdings with buttons drawn by delegates."""
+        self.table = QTableView()
+        self.table.setModel(self.holdings)
 
         # make table fill empty space
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-
-        self.table.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.table.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
 
-        # remake table with new data
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(['Asset', 'Shares', '', ''])
-
-        self.table.setRowCount(len(self.portfolio.get_asset_names()))
-
-        for row, asset in enumerate(self.portfolio.get_pairs()):
-            # asset is tuple (asset, shares)
-            # asset column
-            self.table.setItem(row, 0, QTableWidgetItem(str(asset[0])))
-
-            # shares column
-            self.table.setItem(row, 1, QTableWidgetItem(str(asset[1])))
+        # rows have the same height so the view does not measure each of them
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().hide()
 
-            # add periodically column
-            add_periodically_button = QPushButton('Set Periodical Buying')
-            add_periodically_button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
-            add_periodically_button.clicked.connect(lambda signal, asset_to_add=asset[0]:
-                                                    self.add_periodically_menu(asset_to_add))
-            self.table.setCellWidget(row, 2, add_periodically_button)
+        periodic_delegate = ButtonDelegate(self.table)
+        periodic_delegate.clicked.connect(lambda row: self.add_periodically_menu(self.holdings.assets[row]))
+        self.table.setItemDelegateForColumn(HoldingsModel.PERIODIC_COLUMN, periodic_delegate)
 
-            # remove column (doesn't have a column name)
-            remove_button = QPushButton('Remove')
-            remove_button.clicked.connect(lambda signal, asset_to_remove=asset[0]:
-                                          self.remove_from_portfolio(asset_to_remove))
-            self.table.setCellWidget(row, 3, remove_button)
-
-        self.asset_layout.addWidget(self.table)
+        remove_delegate = ButtonDelegate(self.table)
+        remove_delegate.clicked.connect(lambda row: self.remove_from_portfolio(self.holdings.assets[row]))
+        self.table.setItemDelegateForColumn(HoldingsModel.REMOVE_COLUMN, remove_delegate)
 
     def reload_chart(self):
         self.chart.redraw(self.portfolio)
 
+    def holdings_changed(self):
+        self.reload_chart()
+        self.reload_performance()
+        self.overlap_area.clear()
+
     def remove_from_portfolio(self, asset: Asset):
         """Remove asset from portfolio and table."""
-        self.portfolio.remove_asset(asset)
-        self.reload_table()
-        self.reload_chart()
+        self.holdings.asset_removed(asset)
+        prefetcher.cancel([asset])
+        self.subscribe_to_quotes()
+        self.redraw_timer.start()
 
     def add_periodically_menu(self, asset: Asset):
         """Add periodic buying of asset."""
@@ -194,8 +273,65 @@ class PortfolioWindow(Window):
         if dialog.exec() == QDialog.DialogCode.Accepted:
             if result == [0, 0]:
                 self.portfolio.remove_periodic_asset(asset)
-                return
-            self.portfolio.add_periodic_asset(asset, result[0], result[1])
+            else:
+                self.portfolio.add_periodic_asset(asset, result[0], result[1])
+            self.reload_performance()
+
+    def add_performance_widgets(self):
+        performance_area = QGroupBox('Performance')
+        layout = QVBoxLayout()
+
+        self.performance_area = QTextEdit()
+        self.performance_area.setReadOnly(True)
+        layout.addWidget(self.performance_area)
+
+        # correlations take longer so they are only calculated on request
+        button = QPushButton('Analyze Overlap')
+        button.clicked.connect(self.analyze_overlap)
+        layout.addWidget(button)
+
+        self.overlap_area = QTextEdit()
+        self.overlap_area.setReadOnly(True)
+        layout.addWidget(self.overlap_area)
+
+        performance_area.setLayout(layout)
+        self.main_layout.addWidget(performance_area)
+
+    def reload_performance(self):
+        """Show metrics of the daily portfolio value."""
+        stats = self.portfolio.get_performance()
+        if not stats:
+            self.performance_area.clear()
+            return
+
+        self.performance_area.setHtml(f"""
+            <p>From {stats['start']:%Y-%m-%d} to {stats['end']:%Y-%m-%d}</p>
+            <p>Value: {stats['value']: .2f} $ (periodic purchases: {stats['invested']: .2f} $)</p>
+            <p>Total return: {stats['total_return']: .2f} %</p>
+            <p>Max drawdown: {stats['max_drawdown']: .2f} %</p>
+            <p>Volatility: {stats['volatility']: .2f} % (last month: {stats['recent_volatility']: .2f} %)</p>
+            <p>Sharpe ratio: {stats['sharpe']: .2f}</p>
+        """)
+
+    def analyze_overlap(self):
+        """Describe how much the assets in the portfolio move together."""
+        stats = self.portfolio.analyze_overlap(window=config['OVERLAP_WINDOW'])
+        if not stats:
+            self.overlap_area.setHtml('<p>Add at least two assets to analyze their overlap.</p>')
+            return
+
+        clusters = '; '.join(', '.join(cluster) for cluster in stats['clusters']) or 'none'
+        rolling = stats['rolling_correlation']
+        rolling_html = f"""
+            <p>Rolling correlation over {config['OVERLAP_WINDOW']} days: {rolling[-1]: .2f}
+            (lowest {rolling.min(): .2f}, highest {rolling.max(): .2f} in the last year)</p>
+        """ if len(rolling) else ''
+        self.overlap_area.setHtml(f"""
+            <p>Overlap (average correlation): {stats['average_correlation']: .2f}</p>
+            <p>Diversification ratio: {stats['diversification_ratio']: .2f}</p>
+            <p>Highly correlated groups: {clusters}</p>
+            {rolling_html}
+        """)
 
     def add_historical_testing_widgets(self):
         testing_area = QGroupBox('Historical Testing Area')
@@ -213,11 +349,39 @@ class PortfolioWindow(Window):
         button.clicked.connect(self.test_with_historical_data)
         layout.addWidget(button)
 
+        # rebalancing to the current weights
+        rebalancing_layout = QHBoxLayout()
+
+        self.textbox_frequency = QLineEdit('21')
+        self.textbox_frequency.setPlaceholderText('Trading Days Between Checks (empty for never)')
+        rebalancing_layout.addWidget(self.textbox_frequency)
+
+        self.textbox_threshold = QLineEdit('0')
+        self.textbox_threshold.setPlaceholderText('Drift Threshold in Percent')
+        rebalancing_layout.addWidget(self.textbox_threshold)
+
+        self.textbox_cost = QLineEdit('0.1')
+        self.textbox_cost.setPlaceholderText('Cost in Percent of Trades')
+        rebalancing_layout.addWidget(self.textbox_cost)
+
+        self.textbox_fixed_cost = QLineEdit('0')
+        self.textbox_fixed_cost.setPlaceholderText('Fixed Cost per Trade')
+        rebalancing_layout.addWidget(self.textbox_fixed_cost)
+
+        rebalancing_button = QPushButton('Rebalancing')
+        rebalancing_button.clicked.connect(self.test_with_rebalancing)
+        rebalancing_layout.addWidget(rebalancing_button)
+
+        sweep_button = QPushButton('Compare Schedules')
+        sweep_button.clicked.connect(self.sweep_rebalancing)
+        rebalancing_layout.addWidget(sweep_button)
+
         self.results_area = QTextEdit()
         self.results_area.setReadOnly(True)
 
         outer_layout = QVBoxLayout()
         outer_layout.addLayout(layout)
+        outer_layout.addLayout(rebalancing_layout)
         outer_layout.addWidget(self.results_area)
         testing_area.setLayout(outer_layout)
         self.main_layout.addWidget(testing_area)
@@ -237,6 +401,71 @@ class PortfolioWindow(Window):
             <p><big>Percentage Profit: {profit / buying_price * 100: .2f} %</big></p>
         """)
 
+    def test_with_rebalancing(self) -> None:
+        try:
+            begin_date = pd.to_datetime(self.textbox_begin_date.text())
+            end_date = pd.to_datetime(self.textbox_end_date.text())
+            frequency = int(self.textbox_frequency.text()) if self.textbox_frequency.text() else None
+            threshold = float(self.textbox_threshold.text()) / 100
+            cost = float(self.textbox_cost.text()) / 100
+            fixed_cost = float(self.textbox_fixed_cost.text())
+            if frequency is not None and frequency < 1:
+                raise ValueError('Rebalancing frequency must be at least one day')
+        except ValueError:
+            self.results_area.setHtml('<p>Invalid input</p>')
+            return
+
+        results = self.portfolio.test_with_rebalancing(begin_date, end_date, frequency, threshold, cost, fixed_cost)
+        if not results:
+            self.results_area.setHtml('<p>Not enough data in the period.</p>')
+            return
+
+        trades = results['trades'].tail(10)
+        rows = ''.join(f'<tr><td>{date:%Y-%m-%d}</td><td>{abbrev}</td><td>{shares: .4f}</td><td>{value: .2f} $</td></tr>'
+                       for date, abbrev, shares, value in trades.itertuples(index=False, name=None))
+        self.results_area.setHtml(f"""
+            <h2>Rebalancing Results</h2>
+            <p><big>Final value: {results['final_value']: .2f} $</big></p>
+            <p><big>Annual return: {results['annual_return'] * 100: .2f} %</big></p>
+            <p><big>Volatility: {results['volatility'] * 100: .2f} %</big></p>
+            <p><big>Max drawdown: {results['max_drawdown'] * 100: .2f} %</big></p>
+            <p><big>Rebalances: {results['rebalances']}, costs: {results['costs']: .2f} $</big></p>
+            <h3>Last Trades</h3>
+            <table>
+                <tr><th>Date</th><th>Asset</th><th>Shares</th><th>Value</th></tr>
+                {rows}
+            </table>
+        """)
+
+    def sweep_rebalancing(self) -> None:
+        try:
+            begin_date = pd.to_datetime(self.textbox_begin_date.text())
+            end_date = pd.to_datetime(self.textbox_end_date.text())
+            cost = float(self.textbox_cost.text()) / 100
+            fixed_cost = float(self.textbox_fixed_cost.text())
+        except ValueError:
+            self.results_area.setHtml('<p>Invalid input</p>')
+            return
+
+        table = self.portfolio.sweep_rebalancing(begin_date, end_date, proportional_cost=cost, fixed_cost=fixed_cost)
+        if table.empty:
+            self.results_area.setHtml('<p>Not enough data in the period.</p>')
+            return
+
+        rows = ''.join(f'<tr><td>{"never" if pd.isna(row.frequency) else f"{row.frequency:.0f} days"}</td>'
+                       f'<td>{row.threshold * 100: .0f} %</td><td>{row.final_value: .2f} $</td>'
+                       f'<td>{row.annual_return * 100: .2f} %</td><td>{row.max_drawdown * 100: .2f} %</td>'
+                       f'<td>{row.rebalances}</td><td>{row.costs: .2f} $</td></tr>'
+                       for row in table.itertuples(index=False))
+        self.results_area.setHtml(f"""
+            <h2>Rebalancing Schedules</h2>
+            <table>
+                <tr><th>Checks</th><th>Threshold</th><th>Final Value</th><th>Annual Return</th>
+                <th>Max Drawdown</th><th>Rebalances</th><th>Costs</th></tr>
+                {rows}
+            </table>
+        """)
+
     def add_monte_carlo_widgets(self):
         testing_area = QGroupBox('Monte Carlo Area')
         layout = QHBoxLayout()
@@ -253,13 +482,33 @@ class PortfolioWindow(Window):
         calculate_button.clicked.connect(self.test_with_monte_carlo)
         layout.addWidget(calculate_button)
 
-        testing_area.setLayout(layout)
+        # resampling of historical returns instead of normal shocks
+        bootstrap_layout = QHBoxLayout()
+
+        self.textbox_block = QLineEdit('10')
+        self.textbox_block.setPlaceholderText('Enter Block Length in Trading Days')
+        bootstrap_layout.addWidget(self.textbox_block)
+
+        self.checkbox_stationary = QCheckBox('Random Block Lengths')
+        self.checkbox_stationary.setChecked(True)
+        bootstrap_layout.addWidget(self.checkbox_stationary)
+
+        bootstrap_button = QPushButton('Bootstrap')
+        bootstrap_button.clicked.connect(self.test_with_bootstrap)
+        bootstrap_layout.addWidget(bootstrap_button)
+
+        outer_layout = QVBoxLayout()
+        outer_layout.addLayout(layout)
+        outer_layout.addLayout(bootstrap_layout)
+        testing_area.setLayout(outer_layout)
         self.main_layout.addWidget(testing_area)
 
     def test_with_monte_carlo(self):
         try:
             period = int(self.textbox_period.text())
             simulations = int(self.textbox_simulations.text())
+            if period < 1 or simulations < 1:
+                raise ValueError('Period and number of simulations must be positive')
         except ValueError:
             self.textbox_period.clear()
             self.textbox_period.setPlaceholderText('Invalid input')
@@ -270,6 +519,135 @@ class PortfolioWindow(Window):
         MonteCarloWindow(self.portfolio, period, simulations)
         self.hide()
 
+    def test_with_bootstrap(self):
+        try:
+            period = int(self.textbox_period.text())
+            simulations = int(self.textbox_simulations.text())
+            block = float(self.textbox_block.text())
+            if period < 1 or simulations < 1 or block < 1:
+                raise ValueError('Period, number of simulations and block length must be positive')
+        except ValueError:
+            for textbox in (self.textbox_period, self.textbox_simulations, self.textbox_block):
+                textbox.clear()
+                textbox.setPlaceholderText('Invalid input')
+            return
+
+        if not self.portfolio.get_assets():
+            return
+
+        MonteCarloWindow(self.portfolio, period, simulations, block, self.checkbox_stationary.isChecked())
+        self.hide()
+
+
+    def add_stress_test_widgets(self):
+        testing_area = QGroupBox('Stress Test Area')
+        layout = QHBoxLayout()
+
+        self.textbox_shocks = QLineEdit()
+        self.textbox_shocks.setPlaceholderText('Custom Shocks in Percent (AAPL -30, MSFT -20)')
+        layout.addWidget(self.textbox_shocks)
+
+        button = QPushButton('Stress Test')
+        button.clicked.connect(self.stress_test)
+        layout.addWidget(button)
+
+        self.stress_area = QTextEdit()
+        self.stress_area.setReadOnly(True)
+
+        outer_layout = QVBoxLayout()
+        outer_layout.addLayout(layout)
+        outer_layout.addWidget(self.stress_area)
+        testing_area.setLayout(outer_layout)
+        self.main_layout.addWidget(testing_area)
+
+    def stress_test(self):
+        try:
+            shocks = {}
+            for shock in filter(None, self.textbox_shocks.text().split(',')):
+                abbrev, percentage = shock.split()
+                shocks[abbrev.upper()] = float(percentage) / 100
+        except ValueError:
+            self.textbox_shocks.clear()
+            self.textbox_shocks.setPlaceholderText('Invalid input')
+            return
+
+        if not self.portfolio.get_assets():
+            return
+
+        try:
+            table = self.portfolio.stress_test(shocks)
+        except Exception as e:
+            print(e)
+            self.stress_area.setHtml('<p>The stress test could not be run with this data.</p>')
+            return
+
+        rows = ''.join(f'<tr><td>{name}</td><td>{days}</td><td>{loss: .2f} $</td>'
+                       f'<td>{percentage: .1f} %</td><td>{worst_loss: .2f} $</td></tr>'
+                       for name, days, loss, percentage, worst_loss, _ in
+                       table.head(20).itertuples(index=False, name=None))
+        self.stress_area.setHtml(f"""
+            <table>
+                <tr><th>Scenario</th><th>Days</th><th>Loss</th><th>Loss %</th><th>Worst Loss</th></tr>
+                {rows}
+            </table>
+        """)
+
+    def add_optimization_widgets(self):
+        testing_area = QGroupBox('Optimization Area')
+        layout = QHBoxLayout()
+
+        self.checkbox_long_only = QCheckBox('Long Only')
+        self.checkbox_long_only.setChecked(True)
+        layout.addWidget(self.checkbox_long_only)
+
+        self.checkbox_shrinkage = QCheckBox('Shrink Covariance')
+        layout.addWidget(self.checkbox_shrinkage)
+
+        optimize_button = QPushButton('Optimize')
+        optimize_button.clicked.connect(self.optimize)
+        layout.addWidget(optimize_button)
+
+        self.frontier_chart = FrontierChart()
+        self.optimization_area = QTextEdit()
+        self.optimization_area.setReadOnly(True)
+
+        results_layout = QHBoxLayout()
+        results_layout.addWidget(self.frontier_chart)
+        results_layout.addWidget(self.optimization_area)
+
+        outer_layout = QVBoxLayout()
+        outer_layout.addLayout(layout)
+        outer_layout.addLayout(results_layout)
+        testing_area.setLayout(outer_layout)
+        self.main_layout.addWidget(testing_area)
+
+    def optimize(self):
+        try:
+            results = self.portfolio.optimize(long_only=self.checkbox_long_only.isChecked(),
+                                              shrinkage=self.checkbox_shrinkage.isChecked())
+        except (LinAlgError, ValueError) as e:
+            print(e)
+            self.optimization_area.setHtml('<p>The weights could not be optimized with this data.</p>')
+            return
+
+        if not results:
+            self.optimization_area.setHtml('<p>Add at least two assets to optimize.</p>')
+            return
+
+        self.frontier_chart.draw_chart(results)
+
+        rows = ''.join(f'<tr><td>{name}</td><td>{min_variance * 100: .1f} %</td><td>{max_sharpe * 100: .1f} %</td></tr>'
+                       for name, min_variance, max_sharpe in
+                       zip(results['assets'], results['min_variance'], results['max_sharpe']))
+        self.optimization_area.setHtml(f"""
+            <table>
+                <tr><th>Asset</th><th>Min Variance</th><th>Max Sharpe</th></tr>
+                {rows}
+            </table>
+            <p>Max Sharpe ratio: {results['max_sharpe_stats'][2][0]: .2f}
+            (current: {results['current'][2][0]: .2f})</p>
+        """)
+
 
 class PeriodDialog(QDialog):
     """Pop up window to set up periodic buying of assets."""
@@ -321,15 +699,12 @@ class PeriodDialog(QDialog):
         self.accept()
 
 
-class MonteCarloChartWidget(QWidget):
+class MonteCarloChartWidget(FigureWidget):
     """Create the plot for Monte Carlo simulations."""
 
     def __init__(self, price_paths: ndarray, name: str):
         super().__init__()
         # create plot
-        self.figure, self.ax = plt.subplots()
-        self.canvas = FigureCanvas(self.figure)
-
         self.ax.set_title(f'{name}', color='gray')
         self.ax.set_xlabel('Trading Days', color='gray')
         self.ax.set_ylabel('Price (USD)', color='gray')
@@ -350,9 +725,13 @@ class MonteCarloChartWidget(QWidget):
 
 
 class MonteCarloWindow(Window):
-    """Display information about Monte Carlo simulations."""
+    """Display information about Monte Carlo simulations.
+
+    With a block length the simulations resample blocks of historical daily returns instead of normal shocks.
+    """
 
-    def __init__(self, portfolio: Portfolio, period: int, number_of_simulations: int):
+    def __init__(self, portfolio: Portfolio, period: int, number_of_simulations: int,
+                 block: float | None = None, stationary: bool = True):
         super().__init__()
 
         # create central widget
@@ -361,7 +740,10 @@ class MonteCarloWindow(Window):
         self.central_widget = QWidget()
 
         # calculate monte carlo and add data to window
-        portfolio_paths, stats = portfolio.test_with_monte_carlo(period, number_of_simulations)
+        if block is None:
+            portfolio_paths, stats = portfolio.test_with_monte_carlo(period, number_of_simulations)
+        else:
+            portfolio_paths, stats = portfolio.test_with_bootstrap(period, number_of_simulations, block, stationary)
         self.main_layout.addWidget(MonteCarloChartWidget(portfolio_paths, 'Whole Portfolio'))
         self.main_layout.addWidget(QLabel(f'Initial Portfolio Value: {portfolio.initial_value:.2f}'))
         self.main_layout.addWidget(QLabel(f'Mean Portfolio Value: {stats['mean']:.2f}'))
@@ -369,6 +751,9 @@ class MonteCarloWindow(Window):
         self.main_layout.addWidget(QLabel(f'Best Case (95th Percentile): {stats['best_case']:.2f}'))
         self.main_layout.addWidget(QLabel(f'Standard Deviation: {stats['std_dev']:.2f}'))
         self.main_layout.addWidget(QLabel(f'Probability of Loss: {stats['risk']:.2f}%'))
+        if 'var' in stats:
+            self.main_layout.addWidget(QLabel(f'Value at Risk (95%): {stats['var']:.2f}'))
+            self.main_layout.addWidget(QLabel(f'Expected Shortfall (95%): {stats['cvar']:.2f}'))
 
         self.central_widget.setLayout(self.main_layout)
 
@@ -381,5 +766,5 @@ class MonteCarloWindow(Window):
 
         # set window attributes
         self.setGeometry(*config['WINDOW_SIZE'])
-        self.setWindowTitle('Monte Carlo')
+        self.setWindowTitle('Monte Carlo' if block is None else 'Bootstrap')
         self.show()
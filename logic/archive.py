@@ -0,0 +1,215 @@
+import argparse
+import io
+import os
+import tarfile
+import time
+import zipfile
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from logic.sqlite_connector import sqlite
+from logic.symbols import symbols
+from logic.utils import calc_total_return
+
+CHUNK_ROWS = 250_000 # rows read from a csv file at a time
+NAMES_FILE = 'assets.csv' # abbreviations and names of the assets in an archive
+EXTENSIONS = ('.csv.gz', '.csv', '.parquet')
+BUNDLES = ('.zip', '.tar.gz', '.tgz', '.tar')
+
+# lower case names of columns in archives and the columns they stand for
+COLUMN_NAMES = {
+    'date': 'Date', 'datetime': 'Date',
+    'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume',
+    'dividends': 'Dividends', 'stock splits': 'Stock Splits', 'stock_splits': 'Stock Splits',
+    'total return': 'Total Return', 'total_return': 'Total Return',
+}
+STORED_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits', 'Total Return']
+
+
+def symbol_of(filename: str) -> str | None:
+    """Abbreviation of the asset a file of an archive holds, None for other files."""
+    base = os.path.basename(filename)
+    for extension in EXTENSIONS:
+        if base.lower().endswith(extension) and base != NAMES_FILE:
+            return base[:-len(extension)].upper()
+    return None
+
+
+def archive_files(path: str) -> list[tuple[str, callable]]:
+    """Names of the files of a directory or bundle with a function opening each of them as a binary file."""
+    if os.path.isdir(path):
+        return [(name, lambda name=name: open(os.path.join(path, name), 'rb')) for name in sorted(os.listdir(path))]
+
+    if zipfile.is_zipfile(path):
+        bundle = zipfile.ZipFile(path)
+        return [(name, lambda name=name: bundle.open(name)) for name in bundle.namelist()]
+
+    bundle = tarfile.open(path)
+    return [(member.name, lambda member=member: bundle.extractfile(member))
+            for member in bundle.getmembers() if member.isfile()]
+
+
+def read_chunks(name: str, file):
+    """DataFrames of the rows of a csv or parquet file, csv files are read in chunks."""
+    if name.lower().endswith('.parquet'):
+        # parquet readers need to seek, which compressed bundle members can not
+        yield pd.read_parquet(io.BytesIO(file.read()))
+        return
+
+    # columns that are not stored, like adjusted close, are not parsed
+    compression = 'gzip' if name.lower().endswith('.gz') else None
+    yield from pd.read_csv(file, compression=compression, chunksize=CHUNK_ROWS, engine='c',
+                           usecols=lambda column: column.strip().lower() in COLUMN_NAMES)
+
+
+def normalize(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Rename the columns of a chunk to the stored ones and fill the optional ones."""
+    if 'date' not in map(str.lower, chunk.columns):
+        chunk = chunk.reset_index()
+    chunk = chunk.rename(columns=lambda column: COLUMN_NAMES.get(str(column).strip().lower(), column))
+
+    # dates are kept as text in the local time they were recorded in, cut to the day as fixed width strings
+    dates = chunk['Date']
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        dates = dates.dt.strftime('%Y-%m-%d')
+    dates = dates.to_numpy(dtype='U10')
+    chunk['Date'] = dates
+    if len(dates) > 1 and (dates[1:] < dates[:-1]).any():
+        chunk = chunk.sort_values('Date')
+
+    for column in ('Open', 'High', 'Low'):
+        if column not in chunk:
+            chunk[column] = chunk['Close']
+    for column in ('Volume', 'Dividends', 'Stock Splits'):
+        if column not in chunk:
+            chunk[column] = 0
+    return chunk
+
+
+def to_rows(abbrev: str, chunk: pd.DataFrame) -> list[tuple]:
+    """Rows for the historical table, with the columns converted as whole arrays."""
+    prices = [chunk[column].to_numpy(dtype=float) for column in ('Open', 'High', 'Low', 'Close')]
+    volume = np.nan_to_num(chunk['Volume'].to_numpy(dtype=float)).astype(np.int64)
+    events = [np.nan_to_num(chunk[column].to_numpy(dtype=float)) for column in ('Dividends', 'Stock Splits')]
+    total_return = chunk['Total Return'].to_numpy(dtype=float)
+    return list(zip(chunk['Date'].tolist(), repeat(abbrev), *(array.tolist() for array in prices),
+                    volume.tolist(), *(array.tolist() for array in events), total_return.tolist()))
+
+
+def read_rows(files: list, abbrevs: dict):
+    """(abbreviation, rows) of every chunk of every file of an asset."""
+    for name, open_file in files:
+        abbrev = abbrevs[name]
+        if abbrev is None:
+            continue
+
+        previous = None # last close and total return of the previous chunk
+        with open_file() as file:
+            for chunk in read_chunks(name, file):
+                chunk = normalize(chunk)
+                if 'Total Return' not in chunk or chunk['Total Return'].isna().any():
+                    chunk['Total Return'] = calc_total_return(chunk, previous)
+                if len(chunk):
+                    previous = (chunk['Close'].iloc[-1], chunk['Total Return'].iloc[-1])
+                yield abbrev, to_rows(abbrev, chunk)
+
+
+def import_archive(path: str) -> int:
+    """Store the daily histories of a directory or bundle of csv and parquet files, one file per asset.
+
+    Existing histories of the imported assets are replaced in one transaction and the index is rebuilt
+    once at the end. The total return index is calculated when a file does not have it. Returns the number
+    of imported rows.
+    """
+    files = archive_files(path)
+    abbrevs = {name: symbol_of(name) for name, _ in files}
+
+    names = {}
+    for name, open_file in files:
+        if os.path.basename(name) == NAMES_FILE:
+            with open_file() as file:
+                listing = pd.read_csv(file, dtype=str).fillna('')
+            names = dict(zip(listing['abbreviation'], listing['short_name']))
+
+    sqlite.begin_bulk_import([abbrev for abbrev in abbrevs.values() if abbrev])
+    rows = 0
+    try:
+        for abbrev, chunk_rows in read_rows(files, abbrevs):
+            sqlite.insert_history_rows(chunk_rows)
+            rows += len(chunk_rows)
+            names.setdefault(abbrev, '')
+    except Exception:
+        sqlite.abort_bulk_import()
+        raise
+
+    sqlite.end_bulk_import(names)
+    for abbrev, name in names.items():
+        symbols.add(abbrev, name)
+    return rows
+
+
+def export_archive(path: str, abbrevs: list[str] | None = None, file_format: str = 'csv') -> int:
+    """Write the stored daily histories into a directory or a .zip or .tar.gz bundle, one file per asset.
+
+    The archive can be imported with `import_archive` on another machine. Returns the number of rows.
+    """
+    abbrevs = sqlite.get_stored_abbrevs() if abbrevs is None else abbrevs
+    names = sqlite.get_asset_names()
+
+    files = [(NAMES_FILE, pd.DataFrame({'abbreviation': abbrevs,
+                                        'short_name': [names.get(abbrev) or '' for abbrev in abbrevs]}))]
+    rows = 0
+    for abbrev in abbrevs:
+        history, _ = sqlite.get_data_if_exists(abbrev)
+        files.append((f'{abbrev}.{file_format}', history[STORED_COLUMNS]))
+        rows += len(history)
+
+    write_files(path, files)
+    return rows
+
+
+def write_files(path: str, files: list[tuple[str, pd.DataFrame]]) -> None:
+    def to_bytes(name, frame):
+        if name.endswith('.parquet'):
+            return frame.to_parquet()
+        return frame.to_csv(index=name != NAMES_FILE).encode()
+
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as bundle:
+            for name, frame in files:
+                bundle.writestr(name, to_bytes(name, frame))
+    elif path.endswith(BUNDLES):
+        with tarfile.open(path, 'w:gz' if path.endswith(('.gz', '.tgz')) else 'w') as bundle:
+            for name, frame in files:
+                data = to_bytes(name, frame)
+                member = tarfile.TarInfo(name)
+                member.size = len(data)
+                member.mtime = int(time.time())
+                bundle.addfile(member, io.BytesIO(data))
+    else:
+        os.makedirs(path, exist_ok=True)
+        for name, frame in files:
+            with open(os.path.join(path, name), 'wb') as file:
+                file.write(to_bytes(name, frame))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import or export archives of daily price histories.')
+    parser.add_argument('action', choices=['import', 'export'])
+    parser.add_argument('path', help='directory, .zip or .tar.gz bundle')
+    parser.add_argument('--symbols', nargs='*', help='assets to export, all stored ones by default')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='format of exported files')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.action == 'import':
+        rows = import_archive(args.path)
+    else:
+        rows = export_archive(args.path, args.symbols, args.format)
+    print(f'{rows} rows in {time.perf_counter() - started:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,15 @@
+from logic.config import config
+from logic.history import CompactHistory
+from logic.prefetch import download_history, needs_refresh, prefetcher
 from logic.sqlite_connector import sqlite
+from logic.symbols import symbols
+from logic.utils import choose_resolution, resample_bars, bar_start
 
+import pandas as pd
 import yfinance as yf
 
 import datetime as dt
+import time
 
 
 class Asset:
@@ -11,16 +18,29 @@ class Asset:
     def __init__(self, asset_abbr):
         self.abbrev = asset_abbr.upper()
         self.ticker = yf.Ticker(self.abbrev)
-        self.history, _ = sqlite.get_data_if_exists(self.abbrev)
+        self.data = None
+        self.intraday_checked = 0 # time of the last check for new intraday bars
+        self.quote_time = None # time of the last live quote applied to the last stored day
+        self.sector_name = None
 
-        if self.history.empty:
-            self.history = self.ticker.history('max')
-            self.history = self.history.tz_convert(None)
-            sqlite.insert_into_db(self.abbrev, self.history.copy(), self.short_name)
+        history, self.name = sqlite.get_data_if_exists(self.abbrev)
+        stored = not history.empty
+        if not stored:
+            history = download_history(self.ticker, period='max')
 
-        # raise exception if search is unsuccessful
-        if self.history.empty:
-            raise Exception('No data found.')
+            # raise exception if search is unsuccessful
+            if history.empty:
+                raise Exception('No data found.')
+
+            sqlite.insert_into_db(self.abbrev, history.copy(), self.short_name)
+            symbols.add(self.abbrev, self.short_name)
+
+        self.data = CompactHistory.from_frame(history, config['HISTORY_PRECISION'])
+        if sqlite.get_last_bar_time(self.abbrev, '1w') is None:
+            self.update_rollup('1w', self.data.first_date())
+        if stored and needs_refresh(self.abbrev, self.data.last_date()):
+            # the days after the last stored one are downloaded in the background and added when stored
+            prefetcher.refresh(self.abbrev, self.data.last_date(), self.add_new_days)
 
     def __str__(self):
         return self.short_name
@@ -33,16 +53,113 @@ class Asset:
 
     @property
     def short_name(self):
-        return self.ticker.info.get('shortName', 'No company name available')
+        # the stored name saves a request for the info of the ticker
+        if not self.name:
+            self.name = self.ticker.info.get('shortName', 'No company name available')
+        return self.name
+
+    @property
+    def sector(self):
+        # the sector is downloaded once and stored, without a network it stays unknown until the next try
+        if self.sector_name is None:
+            self.sector_name = sqlite.get_sector(self.abbrev)
+        if self.sector_name is None:
+            try:
+                sector = self.ticker.info.get('sector', 'Unknown')
+            except Exception as e:
+                print(e)
+                return 'Unknown'
+            sqlite.set_sector(self.abbrev, sector)
+            self.sector_name = sector
+        return self.sector_name
+
+    @property
+    def history(self) -> pd.DataFrame:
+        """Whole history as a DataFrame, prefer the methods that read only the needed columns or days."""
+        return self.data.to_frame()
+
+    def add_new_days(self, new_data: pd.DataFrame) -> None:
+        """Add days that were stored after the history was loaded."""
+        new_data = new_data.loc[new_data.index > self.data.last_date()]
+        if not new_data.empty:
+            self.data.append(new_data)
+
+    def apply_quote(self, quote_time: pd.Timestamp, price: float, volume: int = 0) -> bool:
+        """Update the last stored day with a live quote, False when the quote is of another day."""
+        if not self.data.apply_price(quote_time, price, volume):
+            return False
+        self.quote_time = pd.Timestamp(quote_time)
+        return True
+
+    def update_intraday(self) -> None:
+        """Download 5m bars since the last stored one and roll them up into hourly bars."""
+        if time.time() - self.intraday_checked < config['INTRADAY_REFRESH']:
+            return
+        self.intraday_checked = time.time()
+
+        start = dt.datetime.today() - dt.timedelta(days=config['INTRADAY_DAYS'])
+        last_time = sqlite.get_last_bar_time(self.abbrev, '5m')
+        if last_time is not None:
+            start = max(start, last_time)
+
+        bars = self.ticker.history(interval='5m', start=start)
+        if bars.empty:
+            return
+
+        # intraday bars keep the local time of the exchange
+        bars = bars.tz_localize(None)
+        if last_time is not None:
+            # the last stored bar may have been incomplete so it is replaced
+            bars = bars.loc[bars.index >= last_time]
+
+        sqlite.upsert_bars(self.abbrev, '5m', bars)
+        self.update_rollup('1h', bars.index[0])
+
+    def update_rollup(self, resolution: str, since: pd.Timestamp) -> None:
+        """Recalculate the stored bars of a coarser resolution from the bar containing `since` onwards."""
+        start = bar_start(since, resolution)
+        if resolution == '1w':
+            source = self.data.between(start)
+        else:
+            source = sqlite.get_bars(self.abbrev, '5m', start)
+        sqlite.upsert_bars(self.abbrev, resolution, resample_bars(source, resolution))
+
+    def get_bars(self, resolution: str, period: int) -> pd.DataFrame:
+        """Get the bars of a resolution in the last days of a period, updating them if needed."""
+        if resolution == '1d':
+            return self.data.between(self.data.last_date() - dt.timedelta(days=period))
+
+        if resolution != '1w':
+            self.update_intraday()
+
+        last_time = sqlite.get_last_bar_time(self.abbrev, resolution)
+        if last_time is None:
+            return pd.DataFrame()
+        return sqlite.get_bars(self.abbrev, resolution, last_time - dt.timedelta(days=period))
+
+    def get_dates(self) -> pd.DatetimeIndex:
+        return self.data.get_dates()
+
+    def get_column(self, column: str) -> pd.Series:
+        return self.data.get_series(column)
+
+    def get_adjusted_close(self) -> pd.Series:
+        """Close prices adjusted for splits and reinvested dividends, equal to the close on the last day."""
+        total_return = self.data.total_return
+        return pd.Series(total_return * (self.data.get_column('Close')[-1] / total_return[-1]),
+                         index=self.get_dates())
 
     def get_data_between_dates(self, start_date: dt.datetime, end_date: dt.datetime):
-        return self.history.loc[(self.history.index >= start_date) & (self.history.index <= end_date)]
+        return self.data.between(start_date, end_date)
 
     def get_data_in_period(self, period: int):
-        """Get data from specific period (ex. last month)."""
+        """Get data from specific period (ex. last month) in the coarsest resolution with enough bars."""
         try:
-            delta = dt.datetime.today() - dt.timedelta(days=period)
-            # filter for period
-            return self.history.loc[self.history.index >= delta]
+            data = self.get_bars(choose_resolution(period), period)
+            if not data.empty:
+                return data
         except Exception as e:
             print(e)
+
+        # daily data is always available locally
+        return self.get_bars('1d', period)
@@ -0,0 +1,120 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from logic.valuation import TRADING_DAYS
+
+
+class RebalancingBacktest:
+    """Backtest of holdings rebalanced to target weights with transaction costs.
+
+    Rebalancing is checked every `frequency` trading days and done when a weight drifted from its target
+    by more than `threshold`, so a calendar schedule has no threshold and a threshold schedule checks
+    every day. Between rebalances the shares do not change and the values of all those days are one
+    matrix product, the loop only goes over rebalances.
+    """
+
+    def __init__(self, prices: np.ndarray, weights: np.ndarray, frequency: int | None = 21, threshold: float = 0.0,
+                 proportional_cost: float = 0.0, fixed_cost: float = 0.0):
+        if frequency is not None and frequency < 1:
+            raise ValueError('Rebalancing frequency must be at least one day')
+
+        self.prices = prices # days x assets, adjusted for dividends and splits
+        self.weights = weights
+        self.frequency = frequency # None to never rebalance
+        self.threshold = threshold
+        self.proportional_cost = proportional_cost # fraction of the traded value
+        self.fixed_cost = fixed_cost # per asset traded
+
+    def run(self, initial_value: float) -> dict:
+        days = len(self.prices)
+        values = np.empty(days)
+        shares, costs = self.rebalance(np.zeros(len(self.weights)), initial_value, 0)
+
+        # every rebalance is (day, shares before, shares after, costs)
+        trades = [(0, np.zeros_like(shares), shares, costs)]
+        day = 0
+        while True:
+            next_day = self.next_rebalance(shares, day)
+            values[day:next_day] = self.prices[day:next_day] @ shares
+            if next_day >= days:
+                break
+
+            new_shares, costs = self.rebalance(shares, self.prices[next_day] @ shares, next_day)
+            trades.append((next_day, shares, new_shares, costs))
+            shares = new_shares
+            day = next_day
+
+        return {'initial_value': initial_value, 'values': values, 'trades': trades}
+
+    def next_rebalance(self, shares: np.ndarray, day: int) -> int:
+        """First day after `day` on which the holdings are rebalanced, the number of days if there is none."""
+        days = len(self.prices)
+        if self.frequency is None:
+            return days
+
+        checks = np.arange(day + self.frequency, days, self.frequency)
+        if not self.threshold:
+            return int(checks[0]) if len(checks) else days
+
+        # weights are only calculated on the days they are checked, a year of checks at a time
+        for start in range(0, len(checks), TRADING_DAYS):
+            chunk = checks[start:start + TRADING_DAYS]
+            held = self.prices[chunk] * shares
+            drift = np.abs(held / held.sum(axis=1, keepdims=True) - self.weights).max(axis=1)
+            exceeded = np.flatnonzero(drift > self.threshold)
+            if len(exceeded):
+                return int(chunk[exceeded[0]])
+        return days
+
+    def rebalance(self, shares: np.ndarray, value: float, day: int) -> tuple[np.ndarray, float]:
+        """Shares with the target weights after costs are paid from the value of the holdings."""
+        prices = self.prices[day]
+        held = shares * prices
+        net_value = value
+        # the costs depend on the trades, which depend on the value left after costs
+        for _ in range(5):
+            costs = self.cost(self.weights * net_value - held)
+            net_value = value - costs
+        return self.weights * net_value / prices, costs
+
+    def cost(self, traded: np.ndarray) -> float:
+        traded = np.abs(traded)
+        return float(self.proportional_cost * traded.sum() + self.fixed_cost * np.count_nonzero(traded > 1e-9))
+
+
+def trade_log(dates: pd.DatetimeIndex, abbrevs: list[str], prices: np.ndarray, trades: list) -> pd.DataFrame:
+    """One row for every asset bought or sold on every rebalance."""
+    rows = []
+    for day, before, after, costs in trades:
+        traded = after - before
+        for col in np.flatnonzero(np.abs(traded) > 1e-9):
+            rows.append((dates[day], abbrevs[col], traded[col], traded[col] * prices[day, col]))
+    return pd.DataFrame(rows, columns=['Date', 'Asset', 'Shares', 'Value'])
+
+
+def summarize(result: dict) -> dict:
+    """Metrics of the result of a backtest, the costs of the first purchase count as a loss."""
+    values, trades = result['values'], result['trades']
+    returns = values[1:] / values[:-1] - 1
+    growth = np.concatenate(([1.0], values / result['initial_value']))
+    return {
+        'final_value': values[-1],
+        'total_return': growth[-1] - 1,
+        'annual_return': max(growth[-1], 0) ** (TRADING_DAYS / max(len(values), 1)) - 1,
+        'volatility': np.std(returns, ddof=1) * np.sqrt(TRADING_DAYS) if len(returns) > 1 else 0.0,
+        'max_drawdown': (growth / np.maximum.accumulate(growth) - 1).min(),
+        'rebalances': len(trades) - 1,
+        'costs': sum(costs for _, _, _, costs in trades),
+    }
+
+
+def grid_search(prices: np.ndarray, weights: np.ndarray, initial_value: float, frequencies: list[int | None],
+                thresholds: list[float], proportional_cost: float = 0.0, fixed_cost: float = 0.0) -> pd.DataFrame:
+    """Summaries of every combination of rebalancing frequency and threshold, best final value first."""
+    rows = []
+    for frequency, threshold in itertools.product(frequencies, thresholds):
+        backtest = RebalancingBacktest(prices, weights, frequency, threshold, proportional_cost, fixed_cost)
+        rows.append({'frequency': frequency, 'threshold': threshold, **summarize(backtest.run(initial_value))})
+    return pd.DataFrame(rows).sort_values('final_value', ascending=False, ignore_index=True)
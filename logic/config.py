@@ -10,4 +10,34 @@ config = {
         '10 years': 3650,
         'Max': 42069
     }, # available time periods for charts of assets in pairs name: yfinance syntax
+    'RESOLUTIONS': { # bars per calendar day, from finest to coarsest
+        '5m': 78 * 5 / 7,
+        '1h': 7 * 5 / 7,
+        '1d': 5 / 7,
+        '1w': 1 / 7,
+    }, # 5m bars are downloaded, the rest are rolled up from them or from the daily history
+    'INTRADAY_DAYS': 59, # yfinance only serves 5m bars for the last 60 days
+    'INTRADAY_REFRESH': 300, # seconds before intraday bars are checked for updates again
+    'MIN_CHART_POINTS': 20, # the coarsest resolution with at least this many bars is used
+    'MAX_WINDOWS': 10, # windows kept in the navigation history, older ones are closed
+    'FIGURE_POOL_SIZE': 4, # released chart figures kept for reuse
+    'HISTORY_PRECISION': 'float32', # dtype of prices kept in memory, float64 for full precision
+    'QUOTE_SOURCE': 'yahoo', # source of live quotes: yahoo, simulated or replay (both offline)
+    'QUOTE_INTERVAL': 500, # milliseconds between updates of charts and valuation with new quotes
+    'OVERLAP_WINDOW': 63, # trading days of the rolling correlation shown by the overlap analysis
+    'HOLDINGS_REDRAW_DELAY': 300, # milliseconds after the last change of holdings before the chart and metrics are redrawn
+    'CRISES': { # periods replayed by stress tests
+        '2008 Financial Crisis': ('2008-09-01', '2009-03-09'),
+        '2020 Pandemic Crash': ('2020-02-19', '2020-03-23'),
+        '2022 Rate Hikes': ('2022-01-03', '2022-10-12'),
+    },
+    'WORKERS': 4, # processes for bootstrap simulations and backtest sweeps, 1 to run them in the app
+    'PARALLEL_SIMULATIONS': 20000, # smaller bootstrap simulations are faster without worker processes
+    'PREFETCH_WORKERS': 2, # low priority threads downloading histories that are likely to be opened
+    'PREFETCH_QUEUE': 16, # symbols waiting to be downloaded, the least likely ones are dropped
+    'PREFETCH_DEBOUNCE': 400, # milliseconds without typing before the symbols in a search box are downloaded
+    'HISTORY_REFRESH': 3600, # seconds before a stored history is checked for new days again
+    'PREFETCH_SUGGESTIONS': 2, # best suggestions of a search box that are downloaded
+    'PREFETCH_STARTUP': 8, # recently held and most used symbols downloaded when the app starts
+    'SYMBOL_LISTING': 'symbols.csv', # listing file imported into the symbol directory when it changes
 }
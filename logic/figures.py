@@ -0,0 +1,61 @@
+from PyQt6.QtWidgets import QWidget
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+
+from logic.config import config
+
+QWIDGETSIZE_MAX = (1 << 24) - 1 # largest size of a Qt widget
+
+
+class FigurePool:
+    """Reuse matplotlib figures and their canvases between charts.
+
+    Figures are created without pyplot, so nothing keeps them alive after their chart is released.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.free = []
+
+    def acquire(self, figsize: tuple[float, float] | None = None) -> tuple[Figure, FigureCanvas]:
+        if self.free:
+            figure, canvas = self.free.pop()
+        else:
+            figure = Figure()
+            canvas = FigureCanvas(figure)
+
+        if figsize:
+            figure.set_size_inches(*figsize)
+        return figure, canvas
+
+    def release(self, figure: Figure, canvas: FigureCanvas) -> None:
+        figure.clear()
+        canvas.setParent(None)
+        # charts may have fixed the height of the canvas
+        canvas.setMinimumHeight(0)
+        canvas.setMaximumHeight(QWIDGETSIZE_MAX)
+
+        if len(self.free) < self.size:
+            self.free.append((figure, canvas))
+        else:
+            canvas.deleteLater()
+
+
+figures = FigurePool(config['FIGURE_POOL_SIZE'])
+
+
+class FigureWidget(QWidget):
+    """Widget that draws on a figure from the pool and gives it back when released."""
+
+    def __init__(self, figsize: tuple[float, float] | None = None):
+        super().__init__()
+
+        self.figure, self.canvas = figures.acquire(figsize)
+        self.ax = self.figure.add_subplot()
+
+    def release(self) -> None:
+        if self.figure is None:
+            return
+        figures.release(self.figure, self.canvas)
+        self.figure = self.canvas = self.ax = None
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+COLUMNS = [*PRICE_COLUMNS, 'Volume', 'Dividends', 'Stock Splits', 'Total Return']
+
+
+class CompactHistory:
+    """Daily history of an asset stored as contiguous column arrays.
+
+    Days are kept as an int32 number of days since 1970-01-01, prices in the chosen precision and
+    dividends and stock splits only for the days they happened on. A pandas DataFrame with the usual
+    columns is built only when it is asked for.
+    """
+
+    def __init__(self, days: np.ndarray, prices: dict[str, np.ndarray], volume: np.ndarray,
+                 total_return: np.ndarray, events: dict[str, tuple[np.ndarray, np.ndarray]],
+                 last_closes: np.ndarray):
+        self.days = days
+        self.prices = prices
+        self.volume = volume
+        self.total_return = total_return
+        self.events = events # column: (positions of the days with an event, values)
+        self.last_closes = last_closes # closes of the last two days in full precision for live quotes
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, dtype: str = 'float32') -> 'CompactHistory':
+        days = frame.index.to_numpy(dtype='datetime64[D]').astype(np.int32)
+        # copies, the arrays of a DataFrame may be read-only and the last day is updated in place
+        prices = {column: frame[column].to_numpy(dtype=dtype, copy=True) for column in PRICE_COLUMNS}
+        volume = frame['Volume'].fillna(0).to_numpy(dtype=np.int64, copy=True)
+        total_return = frame['Total Return'].to_numpy(dtype=np.float64, copy=True)
+
+        events = {}
+        for column in ('Dividends', 'Stock Splits'):
+            values = frame[column].fillna(0).to_numpy(dtype=np.float64)
+            positions = np.flatnonzero(values).astype(np.int32)
+            events[column] = (positions, values[positions])
+
+        last_closes = frame['Close'].to_numpy(dtype=np.float64)[-2:].copy()
+        return cls(days, prices, volume, total_return, events, last_closes)
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def empty(self) -> bool:
+        return not len(self)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.days, self.volume, self.total_return, *self.prices.values()]
+        arrays += [array for event in self.events.values() for array in event]
+        return sum(array.nbytes for array in arrays)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.prices['Close'].dtype
+
+    def get_dates(self, start: int = 0, stop: int | None = None) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.days[start:stop].astype('datetime64[D]').astype('datetime64[ns]'), name='Date')
+
+    def first_date(self) -> pd.Timestamp:
+        return pd.Timestamp(self.days[0].astype('datetime64[D]'))
+
+    def last_date(self) -> pd.Timestamp:
+        return pd.Timestamp(self.days[-1].astype('datetime64[D]'))
+
+    def get_column(self, column: str, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """Values of one column for a range of positions."""
+        if column in self.prices:
+            return self.prices[column][start:stop]
+        if column == 'Volume':
+            return self.volume[start:stop]
+        if column == 'Total Return':
+            return self.total_return[start:stop]
+
+        # dense array of the events in the range
+        stop = len(self) if stop is None else stop
+        positions, values = self.events[column]
+        dense = np.zeros(stop - start)
+        in_range = (positions >= start) & (positions < stop)
+        dense[positions[in_range] - start] = values[in_range]
+        return dense
+
+    def get_series(self, column: str, start: int = 0, stop: int | None = None) -> pd.Series:
+        return pd.Series(self.get_column(column, start, stop), index=self.get_dates(start, stop), name=column)
+
+    def locate(self, start_date: pd.Timestamp | None = None, end_date: pd.Timestamp | None = None) -> tuple[int, int]:
+        """Positions of the first day on or after `start_date` and after the last day on or before `end_date`."""
+        start, stop = 0, len(self)
+        if start_date is not None:
+            start = np.searchsorted(self.days, self._to_day(pd.Timestamp(start_date).ceil('D')), side='left')
+        if end_date is not None:
+            stop = np.searchsorted(self.days, self._to_day(pd.Timestamp(end_date).floor('D')), side='right')
+        return int(start), int(stop)
+
+    def to_frame(self, start: int = 0, stop: int | None = None) -> pd.DataFrame:
+        """DataFrame with the usual history columns for a range of positions."""
+        return pd.DataFrame({column: self.get_column(column, start, stop) for column in COLUMNS},
+                            index=self.get_dates(start, stop))
+
+    def between(self, start_date: pd.Timestamp | None = None, end_date: pd.Timestamp | None = None) -> pd.DataFrame:
+        return self.to_frame(*self.locate(start_date, end_date))
+
+    def append(self, frame: pd.DataFrame) -> None:
+        """Add days after the last one."""
+        new = CompactHistory.from_frame(frame, self.dtype)
+        offset = len(self)
+
+        self.days = np.concatenate([self.days, new.days])
+        self.prices = {column: np.concatenate([self.prices[column], new.prices[column]]) for column in self.prices}
+        self.volume = np.concatenate([self.volume, new.volume])
+        self.total_return = np.concatenate([self.total_return, new.total_return])
+        self.events = {column: (np.concatenate([positions, new.events[column][0] + offset]).astype(np.int32),
+                                np.concatenate([values, new.events[column][1]]))
+                       for column, (positions, values) in self.events.items()}
+        self.last_closes = np.concatenate([self.last_closes, new.last_closes])[-2:]
+
+    def apply_price(self, date: pd.Timestamp, price: float, volume: int = 0) -> bool:
+        """Update the last day with a new price during that day, prices of other days are ignored."""
+        day = self._to_day(pd.Timestamp(date).floor('D'))
+        if day != self.days[-1]:
+            return False
+
+        self.prices['High'][-1] = max(self.prices['High'][-1], price)
+        self.prices['Low'][-1] = min(self.prices['Low'][-1], price)
+        self.prices['Close'][-1] = price
+        self.last_closes[-1] = price
+        if len(self) > 1:
+            # the total return of the day follows its new close
+            dividend = self.get_column('Dividends', len(self) - 1)[0]
+            self.total_return[-1] = self.total_return[-2] * (price + dividend) / self.last_closes[-2]
+        self.volume[-1] += volume
+        return True
+
+    @staticmethod
+    def _to_day(date: pd.Timestamp) -> int:
+        return int(np.datetime64(date, 'D').astype(np.int32))
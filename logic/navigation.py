@@ -1,13 +1,23 @@
 from PyQt6.QtGui import QAction
 from PyQt6.QtWidgets import QMainWindow
 
+from logic.config import config
+from logic.figures import FigureWidget
+
 
 class Navigation:
-    """Save windows for navigation back and forth."""
+    """Save windows for navigation back and forth.
+
+    At most `max_windows` windows are kept. When there are more, the oldest one after the first window
+    (the main menu) is closed together with its charts.
+    """
 
     windows = []
     at = -1
 
+    def __init__(self, max_windows: int):
+        self.max_windows = max_windows
+
     def add_window(self, window) -> None:
         """Add window and remove old ones forward from current."""
         if self.at < len(self.windows) - 1:
@@ -16,10 +26,15 @@ class Navigation:
         self.windows.append(window)
         self.at += 1
 
+        while len(self.windows) > self.max_windows:
+            self.windows.pop(1).close_window()
+            self.at -= 1
+
     def remove_windows(self, from_idx) -> None:
         """Remove old windows forward from current."""
-        for idx in range(from_idx + 1, len(self.windows)):
-            del self.windows[idx]
+        for window in self.windows[from_idx + 1:]:
+            window.close_window()
+        del self.windows[from_idx + 1:]
 
     def has_forward(self) -> bool:
         return bool(len(self.windows) - self.at - 1)
@@ -52,7 +67,7 @@ class Navigation:
             window.forward.setEnabled(True)
 
 
-nav = Navigation()
+nav = Navigation(config['MAX_WINDOWS'])
 
 
 class Window(QMainWindow):
@@ -74,3 +89,10 @@ class Window(QMainWindow):
 
         self.forward.triggered.connect(nav.move_forward)
         self.navigation.addAction(self.forward)
+
+    def close_window(self) -> None:
+        """Give the figures of all charts back to the pool and delete the window."""
+        for chart in self.findChildren(FigureWidget):
+            chart.release()
+        self.hide()
+        self.deleteLater()
@@ -0,0 +1,140 @@
+import numpy as np
+
+
+def shrink_covariance(returns: np.ndarray) -> np.ndarray:
+    """Ledoit-Wolf shrinkage of the sample covariance towards a scaled identity matrix.
+
+    The sample covariance of many assets over few days is noisy and badly conditioned, pulling it towards
+    the average variance keeps the optimized weights stable.
+    """
+    days, n = returns.shape
+    centered = returns - returns.mean(axis=0)
+    sample = centered.T @ centered / days
+
+    target = np.trace(sample) / n
+    distance = ((sample - target * np.eye(n)) ** 2).sum() / n
+    if not distance:
+        return sample * days / (days - 1)
+
+    squared_norms = (centered ** 2).sum(axis=1)
+    noise = ((squared_norms ** 2).sum() / days - (sample ** 2).sum()) / (n * days)
+    shrinkage = min(noise, distance) / distance
+
+    cov = shrinkage * target * np.eye(n) + (1 - shrinkage) * sample
+    return cov * days / (days - 1)
+
+
+def project_to_simplex(weights: np.ndarray) -> np.ndarray:
+    """Project every row onto the set of non-negative weights that sum to one."""
+    n = weights.shape[-1]
+    ordered = -np.sort(-weights, axis=-1)
+    cumulative = np.cumsum(ordered, axis=-1) - 1
+    ranks = np.arange(1, n + 1)
+    last = (ordered - cumulative / ranks > 0).sum(axis=-1, keepdims=True)
+    threshold = np.take_along_axis(cumulative, last - 1, axis=-1) / last
+    return np.maximum(weights - threshold, 0)
+
+
+class MeanVarianceOptimizer:
+    """Optimize portfolio weights from expected returns and their covariance.
+
+    The covariance matrix is factorized once. Without constraints every point of the efficient frontier is
+    a combination of two solutions of that factorization. With long only weights all points are solved
+    together with accelerated projected gradient steps, every point starting from the solution of the
+    previous run of the same problem.
+    """
+
+    def __init__(self, mu: np.ndarray, cov: np.ndarray, risk_free_rate: float = 0.0):
+        self.mu = np.asarray(mu, dtype=float)
+        self.cov = np.asarray(cov, dtype=float)
+        self.risk_free_rate = risk_free_rate
+
+        # single factorization reused by every solution
+        ones = np.ones(len(self.mu))
+        try:
+            solutions = np.linalg.solve(self.cov, np.column_stack([ones, self.mu]))
+        except np.linalg.LinAlgError:
+            # constant or duplicate assets, or more assets than days, make the covariance singular and
+            # the least squares solutions are used instead
+            solutions = np.linalg.lstsq(self.cov, np.column_stack([ones, self.mu]), rcond=None)[0]
+        self.inv_ones = solutions[:, 0]
+        self.inv_mu = solutions[:, 1]
+        self.lipschitz = np.linalg.eigvalsh(self.cov)[-1]
+
+        self.warm_starts = {} # problem: long only weights it was last solved with
+
+    def stats(self, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return, volatility and Sharpe ratio of every row of weights."""
+        weights = np.atleast_2d(weights)
+        returns = weights @ self.mu
+        volatility = np.sqrt(np.einsum('ij,jk,ik->i', weights, self.cov, weights))
+        sharpe = np.divide(returns - self.risk_free_rate, volatility,
+                           out=np.zeros_like(returns), where=volatility > 0)
+        return returns, volatility, sharpe
+
+    def min_variance(self, long_only: bool = False) -> np.ndarray:
+        if long_only:
+            return self._solve_long_only(np.array([0.0]), 'min_variance')[0]
+        if not self.inv_ones.sum():
+            return np.full(len(self.mu), 1 / len(self.mu))
+        return self.inv_ones / self.inv_ones.sum()
+
+    def max_sharpe(self, long_only: bool = False, points: int = 100) -> np.ndarray:
+        if long_only:
+            weights = self.efficient_frontier(points, long_only=True)
+            return weights[np.argmax(self.stats(weights)[2])]
+
+        excess = self.inv_mu - self.risk_free_rate * self.inv_ones
+        if not excess.sum():
+            return self.min_variance()
+        return excess / excess.sum()
+
+    def efficient_frontier(self, points: int = 100, long_only: bool = False) -> np.ndarray:
+        """Weights of the efficient portfolios from minimum variance to the highest return (points x assets)."""
+        if long_only:
+            # trade off return and variance with a range of risk tolerances
+            scale = np.diag(self.cov).mean() / max(np.abs(self.mu).mean(), 1e-12)
+            tolerance = np.concatenate(([0.0], np.geomspace(1e-2, 1e2, points - 1) * scale))
+            return self._solve_long_only(tolerance, 'frontier')
+
+        min_variance = self.min_variance()
+        direction = self._direction()
+        lowest = min_variance @ self.mu
+        highest = max(self.mu.max(), lowest)
+        targets = np.linspace(lowest, highest, points)
+        scale = direction @ self.mu
+        if not scale:
+            return np.tile(min_variance, (points, 1))
+        return min_variance + np.outer((targets - lowest) / scale, direction)
+
+    def _direction(self) -> np.ndarray:
+        """Self financing portfolio that is added to the minimum variance one along the unconstrained frontier."""
+        return self.inv_mu - self.inv_ones * (self.inv_ones @ self.mu) / self.inv_ones.sum()
+
+    def _solve_long_only(self, tolerance: np.ndarray, problem: str, iterations: int = 1000,
+                         tol: float = 1e-7) -> np.ndarray:
+        """Maximize tolerance * return - variance / 2 over long only weights for every tolerance at once."""
+        n = len(self.mu)
+        warm_start = self.warm_starts.get(problem)
+        if warm_start is not None and warm_start.shape == (len(tolerance), n):
+            weights = warm_start
+        else:
+            # start from the unconstrained solutions projected to long only weights
+            weights = project_to_simplex(self.min_variance() + np.outer(tolerance, self._direction()))
+
+        step = 1 / self.lipschitz
+        momentum = weights.copy()
+        t = 1.0
+        for _ in range(iterations):
+            gradient = momentum @ self.cov - np.outer(tolerance, self.mu)
+            new_weights = project_to_simplex(momentum - step * gradient)
+
+            new_t = (1 + np.sqrt(1 + 4 * t ** 2)) / 2
+            momentum = new_weights + (t - 1) / new_t * (new_weights - weights)
+            change = np.abs(new_weights - weights).max()
+            weights, t = new_weights, new_t
+            if change < tol:
+                break
+
+        self.warm_starts[problem] = weights
+        return weights
@@ -0,0 +1,130 @@
+import numpy as np
+
+
+def log_returns(prices: np.ndarray) -> np.ndarray:
+    """Daily log returns of an aligned price matrix (days x assets)."""
+    return np.diff(np.log(prices), axis=0)
+
+
+def correlation_matrix(returns: np.ndarray) -> np.ndarray:
+    """Pairwise correlation of the columns of a return matrix."""
+    centered = returns - returns.mean(axis=0)
+    std = np.sqrt((centered ** 2).sum(axis=0))
+    std[std == 0] = 1 # constant columns are uncorrelated with everything
+    standardized = centered / std
+    corr = standardized.T @ standardized
+    np.fill_diagonal(corr, 1)
+    return corr
+
+
+def correlated_clusters(corr: np.ndarray, threshold: float = 0.8) -> list[list[int]]:
+    """Group assets connected by a chain of correlations above the threshold.
+
+    Every asset starts with its own label and takes the smallest label of its neighbours until nothing
+    changes, which gives the connected components of the graph of highly correlated pairs.
+    """
+    n = len(corr)
+    adjacency = corr >= threshold
+    np.fill_diagonal(adjacency, True)
+
+    labels = np.arange(n)
+    while True:
+        new_labels = np.where(adjacency, labels, n).min(axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    return [np.flatnonzero(labels == label).tolist() for label in np.unique(labels)]
+
+
+def diversification_ratio(weights: np.ndarray, cov: np.ndarray) -> float:
+    """Weighted average volatility of the assets divided by the volatility of the portfolio."""
+    portfolio_volatility = np.sqrt(weights @ cov @ weights)
+    if not portfolio_volatility:
+        return 1.0
+    return float(weights @ np.sqrt(np.diag(cov)) / portfolio_volatility)
+
+
+class RollingCovariance:
+    """Covariance of the last `window` return vectors updated one day at a time.
+
+    Uses Welford's update to add the newest day and its reverse to drop the oldest, so every step costs
+    one rank-one update of the co-moment matrix instead of recalculating the whole window.
+    """
+
+    def __init__(self, n_assets: int, window: int):
+        self.window = window
+        self.count = 0
+        self.mean = np.zeros(n_assets)
+        self.comoment = np.zeros((n_assets, n_assets))
+        self.buffer = np.zeros((window, n_assets)) # circular buffer of the days in the window
+
+    def update(self, returns: np.ndarray) -> None:
+        """Add the returns of a new day, dropping the oldest one when the window is full."""
+        slot = self.count % self.window
+        if self.count >= self.window:
+            self._remove(self.buffer[slot])
+        self.buffer[slot] = returns
+        self._add(returns)
+        self.count += 1
+
+    def _add(self, returns: np.ndarray) -> None:
+        n = min(self.count, self.window - 1) + 1
+        delta = returns - self.mean
+        self.mean += delta / n
+        self.comoment += np.outer(delta, returns - self.mean)
+
+    def _remove(self, returns: np.ndarray) -> None:
+        n = self.window - 1
+        delta = returns - self.mean
+        self.mean -= delta / n
+        self.comoment -= np.outer(delta, returns - self.mean)
+
+    @property
+    def size(self) -> int:
+        return min(self.count, self.window)
+
+    def covariance(self) -> np.ndarray:
+        if self.size < 2:
+            return np.zeros_like(self.comoment)
+        return self.comoment / (self.size - 1)
+
+    def correlation(self) -> np.ndarray:
+        std = np.sqrt(np.diag(self.comoment))
+        std[std == 0] = 1
+        corr = self.comoment / np.outer(std, std)
+        np.fill_diagonal(corr, 1)
+        return corr
+
+    def average_correlation(self, weights: np.ndarray) -> float:
+        """Weighted average correlation between different assets without building the correlation matrix."""
+        variance = np.diag(self.comoment)
+        std = np.sqrt(variance)
+        scaled = np.divide(weights, std, out=np.zeros_like(weights), where=std > 0)
+        total = weights.sum() ** 2 - (weights ** 2).sum()
+        if not total:
+            return 0.0
+        return float((scaled @ self.comoment @ scaled - (scaled ** 2 * variance).sum()) / total)
+
+
+def rolling_average_correlation(returns: np.ndarray, weights: np.ndarray, window: int = 63,
+                                days: int = 252) -> np.ndarray:
+    """Weighted average pairwise correlation of the windows ending on each of the last `days` days."""
+    returns = returns[-(window + days - 1):]
+    rolling = RollingCovariance(returns.shape[1], window)
+    result = []
+    for day in returns:
+        rolling.update(day)
+        if rolling.size == window:
+            result.append(rolling.average_correlation(weights))
+    return np.array(result)
+
+
+def average_correlation(corr: np.ndarray, weights: np.ndarray) -> float:
+    """Average correlation between different assets weighted by the size of both positions."""
+    pair_weights = np.outer(weights, weights)
+    np.fill_diagonal(pair_weights, 0)
+    total = pair_weights.sum()
+    if not total:
+        return 0.0
+    return float((corr * pair_weights).sum() / total)
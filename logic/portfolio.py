@@ -1,7 +1,10 @@
 import numpy as np
 import pandas as pd
 
+from logic import backtest, optimizer, overlap, risk, scenarios, shared
 from logic.asset import Asset
+from logic.config import config
+from logic.valuation import EquityCurve
 
 import datetime as dt
 
@@ -12,16 +15,21 @@ class Portfolio:
     def __init__(self):
         self.static_assets = {}
         self.periodic_assets = {}
+        self.equity_curve = EquityCurve(self)
+        self.last_optimizer = None # (assets, period, shrinkage) and the optimizer of the last run
 
-    def add_asset(self, name: str, shares: float) -> None:
+    def add_asset(self, name: str, shares: float) -> Asset:
         asset = Asset(name)
         if self.static_assets.get(asset, None):
             self.static_assets[asset] += shares
-            return
-        self.static_assets[asset] = shares
+        else:
+            self.static_assets[asset] = shares
+        self.equity_curve.update_holding(asset)
+        return asset
 
     def add_periodic_asset(self, asset, period, shares) -> None:
         self.periodic_assets[asset] = [period, shares]
+        self.equity_curve.update_holding(asset)
 
     def get_periodic_asset(self, asset) -> list[int, float]:
         return self.periodic_assets.get(asset, [0, 0])
@@ -29,6 +37,7 @@ class Portfolio:
     def remove_periodic_asset(self, asset):
         if asset in self.periodic_assets:
             del self.periodic_assets[asset]
+            self.equity_curve.update_holding(asset)
 
     def get_assets(self):
         return list(self.static_assets.keys())
@@ -36,6 +45,7 @@ class Portfolio:
     def remove_asset(self, asset: Asset) -> None:
         if asset in self.static_assets:
             del self.static_assets[asset]
+            self.equity_curve.remove_holding(asset)
 
     def get_asset_names(self):
         return list(map(str, self.static_assets))
@@ -48,14 +58,55 @@ class Portfolio:
 
     @property
     def initial_value(self):
-        value = 0
-        for asset in self.get_assets():
-            value += self.static_assets[asset] * asset.history.iloc[-1]['Close']
-        return value
+        return float(self.equity_curve.last_prices() @ self.equity_curve.shares)
+
+    def get_performance(self) -> dict:
+        """Get metrics calculated from the daily value of the portfolio."""
+        return self.equity_curve.summary()
+
+    def get_weights(self) -> np.ndarray:
+        """Get the share of every asset in the current value of the portfolio."""
+        values = self.equity_curve.last_prices() * self.equity_curve.shares
+        if not values.sum():
+            return values
+        return values / values.sum()
 
     def calc_overlap(self) -> float:
-        """Calculate the overlap between the assets in the portfolio."""
-        pass
+        """Calculate the overlap between the assets in the portfolio.
+
+        The overlap is the average correlation of daily returns between different assets, weighted by
+        the size of both positions.
+        """
+        if len(self.equity_curve.abbrevs) < 2:
+            return 0.0
+        corr = overlap.correlation_matrix(overlap.log_returns(self.equity_curve.prices))
+        return overlap.average_correlation(corr, self.get_weights())
+
+    def analyze_overlap(self, threshold: float = 0.8, window: int | None = None) -> dict:
+        """Calculate correlations, clusters of highly correlated assets and diversification.
+
+        The average correlation of the rolling windows of `window` days is only calculated when a window is
+        given, it is a loop over days so it is left out unless the analysis is asked for.
+        """
+        abbrevs = self.equity_curve.abbrevs
+        if len(abbrevs) < 2:
+            return {}
+
+        returns = overlap.log_returns(self.equity_curve.prices)
+        weights = self.get_weights()
+        corr = overlap.correlation_matrix(returns)
+        clusters = overlap.correlated_clusters(corr, threshold)
+
+        stats = {
+            'assets': abbrevs,
+            'correlation': corr,
+            'average_correlation': overlap.average_correlation(corr, weights),
+            'clusters': [[abbrevs[idx] for idx in cluster] for cluster in clusters if len(cluster) > 1],
+            'diversification_ratio': overlap.diversification_ratio(weights, np.cov(returns, rowvar=False)),
+        }
+        if window is not None:
+            stats['rolling_correlation'] = overlap.rolling_average_correlation(returns, weights, window)
+        return stats
 
     def test_with_historical_data(self, begin_date: dt.datetime, end_date: dt.datetime) -> tuple[float, float]:
         """Calculate results from historical analysis."""
@@ -66,7 +117,8 @@ class Portfolio:
         for asset, shares in self.get_pairs():
             data = asset.get_data_between_dates(begin_date, end_date)
             buying_price += data.iloc[0]['Open'] * shares
-            final_price += data.iloc[-1]['Close'] * shares
+            # dividends are reinvested and splits are accounted for by the total return index
+            final_price += data.iloc[0]['Close'] * shares * self.calc_growth(data, data.index[0])
 
             # calculate profit from periodic buying
             if asset in self.periodic_assets:
@@ -76,6 +128,50 @@ class Portfolio:
 
         return buying_price, final_price
 
+    def test_with_rebalancing(self, begin_date: dt.datetime, end_date: dt.datetime, frequency: int | None = 21,
+                              threshold: float = 0.0, proportional_cost: float = 0.0, fixed_cost: float = 0.0,
+                              weights: np.ndarray | None = None) -> dict:
+        """Backtest the holdings rebalanced to target weights, by default the current weights.
+
+        The amount invested is the value of the held shares on the first day. Returns the daily values,
+        the trade log and their summary.
+        """
+        curve = self.equity_curve
+        start, stop = curve.dates.searchsorted(begin_date), curve.dates.searchsorted(end_date, side='right')
+        if stop - start < 2:
+            return {}
+
+        prices = curve.prices[start:stop]
+        weights = self.get_weights() if weights is None else weights
+        rebalancing = backtest.RebalancingBacktest(prices, weights, frequency, threshold, proportional_cost, fixed_cost)
+        result = rebalancing.run(float(prices[0] @ curve.shares))
+
+        return {
+            'values': pd.Series(result['values'], index=curve.dates[start:stop]),
+            'trades': backtest.trade_log(curve.dates[start:stop], curve.abbrevs, prices, result['trades']),
+            **backtest.summarize(result),
+        }
+
+    def sweep_rebalancing(self, begin_date: dt.datetime, end_date: dt.datetime,
+                          frequencies: list[int | None] = (None, 5, 21, 63, 126, 252),
+                          thresholds: list[float] = (0.0, 0.02, 0.05, 0.1),
+                          proportional_cost: float = 0.0, fixed_cost: float = 0.0) -> pd.DataFrame:
+        """Summaries of rebalancing to the current weights with every frequency and threshold, best first."""
+        curve = self.equity_curve
+        start, stop = curve.dates.searchsorted(begin_date), curve.dates.searchsorted(end_date, side='right')
+        if stop - start < 2:
+            return pd.DataFrame()
+
+        prices = curve.prices[start:stop]
+        initial_value = float(prices[0] @ curve.shares)
+        if config['WORKERS'] <= 1:
+            return backtest.grid_search(prices, self.get_weights(), initial_value, frequencies, thresholds,
+                                        proportional_cost, fixed_cost)
+
+        with shared.SharedMatrix(prices, curve.dates[start:stop]) as matrix:
+            return shared.parallel_grid_search(matrix, self.get_weights(), initial_value, frequencies, thresholds,
+                                               proportional_cost, fixed_cost)
+
     def calc_periodic(self, asset: Asset,
                       begin_date: dt.datetime,
                       end_date: dt.datetime,
@@ -97,37 +193,86 @@ class Portfolio:
         while begin_date <= end_date:
             one_day_delta = pd.Timedelta(days=1)
             temp_date = begin_date
-            to_buy = data.loc[data.index == begin_date]['Open']
+            to_buy = data.loc[data.index == begin_date]
             while to_buy.empty and temp_date <= end_date:
                 temp_date += one_day_delta
-                to_buy = data.loc[data.index == temp_date]['Open']
+                to_buy = data.loc[data.index == temp_date]
 
             if to_buy.empty:
                 begin_date += delta
                 continue
 
-            buying_price += to_buy.iloc[0] * shares_per_period
-            final_price += data.iloc[-1]['Close'] * shares_per_period
+            buying_price += to_buy.iloc[0]['Open'] * shares_per_period
+            final_price += to_buy.iloc[0]['Close'] * shares_per_period * self.calc_growth(data, to_buy.index[0])
             begin_date += delta
 
         return buying_price, final_price
 
-    def test_with_monte_carlo(self, period: int, number_of_simulations: int):
+    @staticmethod
+    def calc_growth(data: pd.DataFrame, date: dt.datetime) -> float:
+        """Calculate the total return from the close of a day to the end of the data."""
+        return data.iloc[-1]['Total Return'] / data.loc[date, 'Total Return']
+
+    def estimate_returns(self, period: int, shrinkage: bool = False) -> tuple[np.ndarray, np.ndarray]:
+        """Estimate expected returns and their covariance over a period in trading days."""
         data = pd.DataFrame()
-        initial_portfolio_value = 0
         for asset in self.get_assets():
-            data[asset.asset_abbr] = asset.history['Close'] * self.static_assets[asset]
-            initial_portfolio_value += self.static_assets[asset] * asset.history.iloc[-1]['Close']
+            data[asset.abbrev] = asset.get_column('Total Return')
 
         data = data.dropna()
-        returns = np.log(data / data.shift(1))
+        returns = np.log(data / data.shift(1)).dropna().to_numpy()
+
+        mu = returns.mean(axis=0) * period
+        if shrinkage:
+            cov_matrix = optimizer.shrink_covariance(returns) * period
+        else:
+            cov_matrix = np.cov(returns, rowvar=False).reshape(len(mu), len(mu)) * period
+        return mu, cov_matrix
+
+    def optimize(self, period: int = 252, long_only: bool = True, shrinkage: bool = False,
+                 points: int = 100) -> dict:
+        """Find minimum variance and maximum Sharpe weights and the efficient frontier."""
+        if len(self.static_assets) < 2:
+            return {}
+
+        mu, cov_matrix = self.estimate_returns(period, shrinkage)
+        key = (tuple(asset.abbrev for asset in self.get_assets()), period, shrinkage)
+        previous = self.last_optimizer[1] if self.last_optimizer and self.last_optimizer[0] == key else None
+        if previous is not None and np.array_equal(previous.mu, mu) and np.array_equal(previous.cov, cov_matrix):
+            # nothing changed since the last run, its solutions are reused as they are
+            mean_variance = previous
+        else:
+            mean_variance = optimizer.MeanVarianceOptimizer(mu, cov_matrix)
+            # solutions of the previous run are the starting point when the same assets are optimized again
+            if previous is not None:
+                mean_variance.warm_starts = dict(previous.warm_starts)
+        self.last_optimizer = key, mean_variance
+
+        frontier = mean_variance.efficient_frontier(points, long_only)
+        frontier_returns, frontier_volatility, frontier_sharpe = mean_variance.stats(frontier)
+        min_variance = frontier[0] if long_only else mean_variance.min_variance()
+        max_sharpe = frontier[np.argmax(frontier_sharpe)] if long_only else mean_variance.max_sharpe()
+
+        return {
+            'assets': self.get_asset_names(),
+            'current': mean_variance.stats(self.get_weights()),
+            'frontier_returns': frontier_returns,
+            'frontier_volatility': frontier_volatility,
+            'min_variance': min_variance,
+            'min_variance_stats': mean_variance.stats(min_variance),
+            'max_sharpe': max_sharpe,
+            'max_sharpe_stats': mean_variance.stats(max_sharpe),
+        }
+
+    def test_with_monte_carlo(self, period: int, number_of_simulations: int):
+        risk.check_simulation_size(period, number_of_simulations)
+        initial_portfolio_value = self.initial_value
         shares = self.get_shares()
         total_shares = sum(shares)
         weights = np.array(list(map(lambda s: s / total_shares, shares)))
 
         # calculate portfolio expected return and volatility
-        mu = returns.mean() * period  # annualized returns
-        cov_matrix = returns.cov() * period  # annualized covariance matrix
+        mu, cov_matrix = self.estimate_returns(period)
 
         # portfolio drift (mean return)
         portfolio_return = np.sum(weights * mu)
@@ -157,3 +302,61 @@ class Portfolio:
         }
 
         return paths, results
+
+    def test_with_bootstrap(self, period: int, number_of_simulations: int, block: float = 10,
+                            stationary: bool = True, confidence: float = 0.95, number_of_paths: int = 100):
+        """Simulate the current holdings over a period by resampling blocks of historical daily returns.
+
+        Returns a few paths of the portfolio value for charts and the statistics of all simulations.
+        """
+        risk.check_simulation_size(period, number_of_simulations)
+        curve = self.equity_curve
+        log_returns = overlap.log_returns(curve.prices)
+        values = curve.last_prices() * curve.shares
+        bootstrap = risk.BootstrapRisk(log_returns, values, block, stationary)
+
+        # large simulations are split between worker processes reading the returns from shared memory
+        if config['WORKERS'] > 1 and number_of_simulations >= config['PARALLEL_SIMULATIONS']:
+            with shared.SharedMatrix(log_returns, curve.dates[1:]) as matrix:
+                final_values = shared.parallel_bootstrap(matrix, values, period, number_of_simulations,
+                                                         block, stationary)
+        else:
+            final_values = bootstrap.simulate(period, number_of_simulations)
+
+        results = risk.statistics(values.sum(), final_values, confidence)
+        return bootstrap.sample_paths(period, min(number_of_paths, number_of_simulations)), results
+
+    def stress_test(self, shocks: dict[str, float] | None = None,
+                    scenario_set: scenarios.ScenarioSet | None = None) -> pd.DataFrame:
+        """Evaluate the holdings and periodic purchases under scenarios and rank them by loss.
+
+        Without a scenario set the crises in CRISES and shocks of every sector are used, together with
+        the returns of single assets in `shocks`.
+        """
+        curve = self.equity_curve
+        assets = self.get_assets()
+        if scenario_set is None:
+            scenario_set = scenarios.ScenarioSet(curve.abbrevs)
+            scenarios.crisis_scenarios(scenario_set, assets)
+            scenarios.sector_scenarios(scenario_set, [asset.sector for asset in assets])
+            if shocks:
+                scenarios.asset_scenarios(scenario_set, shocks)
+
+        # periods of purchases are in calendar days and scenarios in trading days
+        periodic = [self.get_periodic_asset(asset) for asset in assets]
+        periods = np.array([max(1, round(period * 5 / 7)) if period else 0 for period, _ in periodic])
+        purchases = np.array([shares for _, shares in periodic], dtype=float) * curve.last_prices()
+
+        tables = []
+        for names, returns in scenario_set.batches():
+            results = scenarios.evaluate(returns, curve.last_prices() * curve.shares, purchases, periods)
+            tables.append(pd.DataFrame({'Scenario': names,
+                                        'Days': returns.shape[1],
+                                        'Loss': results['loss'],
+                                        'Loss %': results['loss_percentage'],
+                                        'Worst Loss': results['worst_loss'],
+                                        'Final Value': results['final_value']}))
+
+        if not tables:
+            return pd.DataFrame(columns=['Scenario', 'Days', 'Loss', 'Loss %', 'Worst Loss', 'Final Value'])
+        return pd.concat(tables).sort_values('Loss', ascending=False, ignore_index=True)
@@ -0,0 +1,236 @@
+import datetime as dt
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import yfinance as yf
+
+from PyQt6.QtCore import QTimer
+
+from logic.config import config
+from logic.sqlite_connector import sqlite
+from logic.symbols import symbols
+from logic.utils import calc_total_return, resample_bars, bar_start
+
+FLUSH_INTERVAL = 250 # milliseconds between stores of downloaded histories
+
+# abbreviation: time the days after the last stored one were last downloaded
+refreshed = {}
+
+
+def download_history(ticker: yf.Ticker, **kwargs) -> pd.DataFrame:
+    """Download raw prices and add the total return index."""
+    history = ticker.history(auto_adjust=False, **kwargs)
+    if history.empty:
+        return history
+
+    history = history.tz_convert(None).drop(columns=['Adj Close'], errors='ignore')
+    history['Total Return'] = calc_total_return(history)
+    return history
+
+
+def needs_refresh(abbrev: str, last_date: pd.Timestamp | None) -> bool:
+    """Whether the days after the last stored one should be downloaded, None when nothing is stored."""
+    if time.time() - refreshed.get(abbrev, 0) < config['HISTORY_REFRESH']:
+        return False
+    # the current day is kept up to date by live quotes
+    return last_date is None or last_date.date() < pd.Timestamp.today().date()
+
+
+def download_new_days(abbrev: str, ticker: yf.Ticker, last_date: pd.Timestamp) -> pd.DataFrame:
+    """Download the days after `last_date`, they are stored with `store_new_days`."""
+    refreshed[abbrev] = time.time()
+    return download_history(ticker, start=last_date + dt.timedelta(days=1))
+
+
+def store_new_days(abbrev: str, history: pd.DataFrame) -> pd.DataFrame:
+    """Store the days of a downloaded history after the last stored day and return them.
+
+    The total return index is continued from the last stored day, which may be later than when the
+    history was downloaded. Weekly bars are rolled up again from the week of the first new day.
+    """
+    last_date, close, total_return = sqlite.get_last_day(abbrev)
+    if not history.empty:
+        history = history.loc[history.index > last_date].copy()
+    if history.empty:
+        return history
+
+    history['Total Return'] = calc_total_return(history, (close, total_return))
+    sqlite.append_history(abbrev, history.copy())
+
+    # assets without weekly bars roll up their whole history when they are opened
+    if sqlite.get_last_bar_time(abbrev, '1w') is not None:
+        start = bar_start(history.index[0], '1w')
+        sqlite.upsert_bars(abbrev, '1w', resample_bars(sqlite.get_daily_bars(abbrev, start), '1w'))
+    return history
+
+
+class Prefetcher:
+    """Download histories of symbols that are likely to be opened soon in low priority background threads.
+
+    Symbols that are not stored get their whole history and stored ones the days after the last stored
+    day. Waiting symbols are kept in a bounded queue, urgent ones (typed in a search box) first, and the
+    oldest ones are dropped when it is full. Downloads happen in the background but the database is only
+    written in the Qt thread, by a timer, like the live quotes. Opened assets refresh their history here
+    too, before any other symbol, and are called back with the new days once they are stored.
+    """
+
+    def __init__(self, workers: int, size: int):
+        self.workers = workers
+        self.size = size
+        # abbreviation: (whether it is urgent, last stored day or None), in the order they are downloaded
+        self.pending = OrderedDict()
+        self.running = {} # abbreviation: whether it is urgent
+        self.cancelled = set() # running downloads whose results are thrown away
+        self.callbacks = {} # abbreviation: functions called with the new days once they are stored
+        self.downloaded = [] # (abbreviation, history, name) waiting to be stored
+        self.condition = threading.Condition()
+
+        self.threads = []
+        self.timer = None
+
+    def request(self, abbrevs: list[str], urgent: bool = False) -> None:
+        """Download symbols in the background, urgent requests replace the previous urgent ones."""
+        last_dates = {}
+        for abbrev in dict.fromkeys(abbrevs):
+            last_day = sqlite.get_last_day(abbrev)
+            last_date = last_day[0] if last_day else None
+            if needs_refresh(abbrev, last_date):
+                last_dates[abbrev] = last_date
+
+        with self.condition:
+            if urgent:
+                # opened assets keep waiting for their new days
+                self._cancel(lambda abbrev, is_urgent: is_urgent and abbrev not in last_dates
+                             and abbrev not in self.callbacks)
+
+            for abbrev, last_date in reversed(last_dates.items()) if urgent else last_dates.items():
+                if abbrev in self.running or (abbrev in self.pending and self.pending[abbrev][0] >= urgent):
+                    continue
+                self.pending[abbrev] = (urgent, last_date)
+                self.pending.move_to_end(abbrev, last=not urgent)
+
+            while len(self.pending) > self.size:
+                self.pending.popitem()
+            self.condition.notify_all()
+
+        self.start()
+
+    def refresh(self, abbrev: str, last_date: pd.Timestamp, on_stored) -> None:
+        """Download the days after the last stored one of an opened asset before anything else."""
+        with self.condition:
+            self.callbacks.setdefault(abbrev, []).append(on_stored)
+            if abbrev in self.running:
+                # a prefetch of the asset is already downloading the same days
+                self.cancelled.discard(abbrev)
+            else:
+                self.pending[abbrev] = (True, last_date)
+                self.pending.move_to_end(abbrev, last=False)
+                self.condition.notify_all()
+
+        self.start()
+
+    def cancel(self, assets: list) -> None:
+        """Stop refreshing assets that were closed, unless other opened assets still wait for the same symbol."""
+        with self.condition:
+            abbrevs = set()
+            for asset in assets:
+                callbacks = self.callbacks.get(asset.abbrev, [])
+                waiting = [callback for callback in callbacks if callback != asset.add_new_days]
+                if len(waiting) == len(callbacks):
+                    continue
+                if waiting:
+                    self.callbacks[asset.abbrev] = waiting
+                else:
+                    del self.callbacks[asset.abbrev]
+                    abbrevs.add(asset.abbrev)
+            self._cancel(lambda abbrev, is_urgent: abbrev in abbrevs)
+
+    def _cancel(self, selected) -> None:
+        for abbrev, (is_urgent, _) in list(self.pending.items()):
+            if selected(abbrev, is_urgent):
+                del self.pending[abbrev]
+        self.cancelled.update(abbrev for abbrev, is_urgent in self.running.items() if selected(abbrev, is_urgent))
+
+    def start(self) -> None:
+        if self.threads:
+            return
+
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(FLUSH_INTERVAL)
+
+    def _work(self) -> None:
+        # lower the priority of this thread only, threads are scheduled on their own on Linux
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+        except (AttributeError, OSError):
+            pass
+
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                abbrev, (urgent, last_date) = self.pending.popitem(last=False)
+                self.running[abbrev] = urgent
+
+            result = self._download(abbrev, last_date)
+
+            with self.condition:
+                del self.running[abbrev]
+                if abbrev in self.cancelled:
+                    # the days were not stored, so the symbol can be downloaded again right away
+                    self.cancelled.discard(abbrev)
+                    refreshed.pop(abbrev, None)
+                else:
+                    self.downloaded.append(result)
+
+    @staticmethod
+    def _download(abbrev: str, last_date: pd.Timestamp | None) -> tuple:
+        ticker = yf.Ticker(abbrev)
+        try:
+            if last_date is None:
+                refreshed[abbrev] = time.time()
+                return abbrev, download_history(ticker, period='max'), ticker.info.get('shortName')
+            return abbrev, download_new_days(abbrev, ticker, last_date), None
+        except Exception as e:
+            # an empty history still lets opened assets stop waiting for it
+            print(e)
+            return abbrev, pd.DataFrame(), None
+
+    def flush(self) -> None:
+        """Store the downloaded histories."""
+        with self.condition:
+            downloaded, self.downloaded = self.downloaded, []
+
+        for abbrev, history, name in downloaded:
+            callbacks = self.callbacks.pop(abbrev, [])
+            if history.empty:
+                continue
+
+            # the asset may have been opened and stored while it was downloaded
+            if sqlite.get_last_day(abbrev) is None:
+                sqlite.insert_into_db(abbrev, history.copy(), name or '')
+                symbols.add(abbrev, name or '')
+                continue
+
+            new_days = store_new_days(abbrev, history)
+            for callback in callbacks:
+                callback(new_days)
+
+
+prefetcher = Prefetcher(config['PREFETCH_WORKERS'], config['PREFETCH_QUEUE'])
+
+
+def prefetch_at_startup() -> None:
+    """Download the symbols last held in a portfolio and the most used ones."""
+    recent = sqlite.get_recent_symbols('portfolio', config['PREFETCH_STARTUP'])
+    frequent = sqlite.get_frequent_symbols(config['PREFETCH_STARTUP'])
+    prefetcher.request(recent + frequent)
@@ -0,0 +1,219 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from PyQt6.QtCore import QTimer
+
+from logic.config import config
+from logic.sqlite_connector import sqlite
+
+
+class QuoteSource(ABC):
+    """Produce live quotes (abbreviation, time, price, volume) for a set of subscribed abbreviations.
+
+    The set is shared with the stream and may change while quotes are produced. Quotes are produced in
+    a background thread, everything a source needs from the database is read in `prepare`. Quotes carry
+    the time at the exchange, the offline sources date them with the start of the day they replay.
+    """
+
+    persistent = False # whether quotes are real prices that are written to the database
+
+    def prepare(self, asset) -> None:
+        """Called in the Qt thread for every asset when it is subscribed."""
+        pass
+
+    @abstractmethod
+    async def quotes(self, abbrevs: set[str]):
+        """Asynchronous generator of quotes."""
+
+
+class YahooSource(QuoteSource):
+    """Poll the last price of every subscribed asset from yfinance."""
+
+    persistent = True
+
+    def __init__(self, interval: float = 15):
+        self.interval = interval
+        self.tickers = {}
+
+    def last_price(self, abbrev: str) -> tuple[pd.Timestamp, float]:
+        ticker = self.tickers.setdefault(abbrev, yf.Ticker(abbrev))
+        # the time is the one at the exchange like the stored intraday bars, not the local one
+        now = pd.Timestamp.now(tz=ticker.fast_info['timezone']).tz_localize(None)
+        return now, float(ticker.fast_info['lastPrice'])
+
+    async def quotes(self, abbrevs: set[str]):
+        while True:
+            for abbrev in list(abbrevs):
+                try:
+                    quote_time, price = await asyncio.to_thread(self.last_price, abbrev)
+                except Exception as e:
+                    print(e)
+                    continue
+                yield abbrev, quote_time, price, 0
+            await asyncio.sleep(self.interval)
+
+
+class SimulatedSource(QuoteSource):
+    """Random walk from the last stored close of every asset during its last stored day, for testing
+    without a network."""
+
+    def __init__(self, ticks_per_second: float = 200, volatility: float = 0.0005):
+        self.ticks_per_second = ticks_per_second
+        self.volatility = volatility
+        self.prices = {}
+        self.days = {}
+
+    def prepare(self, asset) -> None:
+        self.prices.setdefault(asset.abbrev, float(asset.data.get_column('Close')[-1]))
+        self.days.setdefault(asset.abbrev, asset.data.last_date())
+
+    async def quotes(self, abbrevs: set[str]):
+        rng = np.random.default_rng()
+        while True:
+            await asyncio.sleep(1 / self.ticks_per_second)
+            available = sorted(abbrevs & self.prices.keys())
+            if not available:
+                continue
+
+            abbrev = available[rng.integers(len(available))]
+            self.prices[abbrev] *= np.exp(self.volatility * rng.standard_normal())
+            yield abbrev, self.days[abbrev], self.prices[abbrev], int(rng.integers(1, 100))
+
+
+class ReplaySource(QuoteSource):
+    """Replay stored 5m bars of every asset as if they were happening during its last stored day."""
+
+    def __init__(self, speed: float = 60):
+        self.speed = speed # bars per second
+        self.bars = {}
+        self.positions = {}
+        self.days = {}
+
+    def prepare(self, asset) -> None:
+        if asset.abbrev in self.bars:
+            return
+
+        bars = sqlite.get_bars(asset.abbrev, '5m')
+        if bars.empty:
+            # replay the last year of days when there are no intraday bars
+            bars = asset.get_bars('1d', 365)
+        self.bars[asset.abbrev] = bars[['Close', 'Volume']].to_numpy(dtype=float)
+        self.positions[asset.abbrev] = 0
+        self.days[asset.abbrev] = asset.data.last_date()
+
+    async def quotes(self, abbrevs: set[str]):
+        while True:
+            await asyncio.sleep(1 / self.speed)
+            for abbrev in sorted(abbrevs & self.bars.keys()):
+                bars = self.bars[abbrev]
+                if not len(bars):
+                    continue
+                position = self.positions[abbrev] % len(bars)
+                self.positions[abbrev] += 1
+                yield abbrev, self.days[abbrev], float(bars[position, 0]), int(bars[position, 1])
+
+
+SOURCES = {
+    'yahoo': YahooSource,
+    'simulated': SimulatedSource,
+    'replay': ReplaySource,
+}
+
+
+class QuoteStream:
+    """Receive quotes in a background asyncio loop and hand them to subscribers in the Qt thread.
+
+    Ticks are coalesced per asset in the background thread. A timer in the Qt thread takes the latest
+    quote of every asset at most every QUOTE_INTERVAL milliseconds, applies them to the last day of the
+    histories, writes them to the database in one transaction and then calls every subscriber once.
+    Quotes of other days are dropped, new days are only added by downloading the history, and quotes
+    of the offline sources are never written.
+    """
+
+    def __init__(self, source: QuoteSource):
+        self.source = source
+        self.abbrevs = set()
+        self.subscribers = {} # callback: list of assets
+        self.pending = {} # abbreviation: (time, last price, volume since the last flush)
+        self.lock = threading.Lock()
+
+        self.loop = None
+        self.thread = None
+        self.timer = None
+
+    def subscribe(self, assets: list, callback) -> None:
+        """Call `callback` with the updated assets whenever new quotes of any of them arrive."""
+        for asset in assets:
+            self.source.prepare(asset)
+        self.subscribers[callback] = list(assets)
+        self.update_abbrevs()
+        self.start()
+
+    def unsubscribe(self, callback) -> None:
+        self.subscribers.pop(callback, None)
+        self.update_abbrevs()
+
+    def update_abbrevs(self) -> None:
+        with self.lock:
+            self.abbrevs.clear()
+            self.abbrevs.update(asset.abbrev for assets in self.subscribers.values() for asset in assets)
+
+    def start(self) -> None:
+        if self.thread is not None:
+            return
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self._receive(),), daemon=True)
+        self.thread.start()
+
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(config['QUOTE_INTERVAL'])
+
+    async def _receive(self) -> None:
+        async for abbrev, quote_time, price, volume in self.source.quotes(self.abbrevs):
+            with self.lock:
+                volume += self.pending.get(abbrev, (None, None, 0))[2]
+                self.pending[abbrev] = (quote_time, price, volume)
+
+    def flush(self) -> None:
+        """Apply the quotes received since the last flush and notify subscribers."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+
+        started = time.perf_counter()
+
+        # the same asset may be loaded by several windows
+        updated = {}
+        applied = {} # abbreviation: (day, price, volume) of the quotes applied to a stored day
+        for assets in self.subscribers.values():
+            for asset in assets:
+                if asset.abbrev not in pending or id(asset) in updated:
+                    continue
+                if asset.apply_quote(*pending[asset.abbrev]):
+                    updated[id(asset)] = asset
+                    applied[asset.abbrev] = (asset.data.last_date(), *pending[asset.abbrev][1:])
+
+        # the stored day is updated from the quote, not from the histories kept in lower precision
+        if self.source.persistent and applied:
+            sqlite.apply_quotes([(abbrev, *quote) for abbrev, quote in applied.items()])
+
+        for callback, assets in list(self.subscribers.items()):
+            changed = [asset for asset in assets if id(asset) in updated]
+            if changed:
+                callback(changed)
+
+        # slow redraws make the timer wait longer so the event loop is never saturated
+        elapsed = (time.perf_counter() - started) * 1000
+        self.timer.setInterval(max(config['QUOTE_INTERVAL'], int(elapsed * 4)))
+
+
+quotes = QuoteStream(SOURCES[config['QUOTE_SOURCE']]())
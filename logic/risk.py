@@ -0,0 +1,108 @@
+import numpy as np
+
+
+def check_simulation_size(horizon: int, paths: int) -> None:
+    if horizon < 1 or paths < 1:
+        raise ValueError('Simulations need at least one day and one path')
+
+
+def stationary_bootstrap_indices(days: int, horizon: int, paths: int, mean_block: float,
+                                 rng: np.random.Generator) -> np.ndarray:
+    """Indices of resampled days (paths x horizon) for the stationary bootstrap.
+
+    Every step starts a new block at a random day with probability 1 / mean_block, otherwise it takes
+    the day after the previous one, so blocks have geometrically distributed lengths.
+    """
+    new_block = rng.random((paths, horizon)) < 1 / mean_block
+    new_block[:, 0] = True
+    starts = rng.integers(0, days, (paths, horizon), dtype=np.int32)
+
+    # position in the path where the current block started
+    steps = np.arange(horizon, dtype=np.int32)
+    block_start = np.maximum.accumulate(np.where(new_block, steps, 0), axis=1)
+
+    offset = steps - block_start
+    return (np.take_along_axis(starts, block_start, axis=1) + offset) % days
+
+
+def block_bootstrap_indices(days: int, horizon: int, paths: int, block: int,
+                            rng: np.random.Generator) -> np.ndarray:
+    """Indices of resampled days (paths x horizon) made of blocks of consecutive days with a fixed length."""
+    blocks = -(-horizon // block)
+    starts = rng.integers(0, days - block + 1, (paths, blocks), dtype=np.int32)
+    steps = np.arange(horizon, dtype=np.int32)
+    return starts[:, steps // block] + steps % block
+
+
+class BootstrapRisk:
+    """Non-parametric risk of a portfolio from resampled historical daily returns.
+
+    Whole days of returns of all assets are resampled together, which keeps the dependence between
+    assets, and in blocks of consecutive days, which keeps autocorrelation. Paths are generated as index
+    arrays in chunks, so memory stays bounded and there is no loop over single paths.
+    """
+
+    def __init__(self, log_returns: np.ndarray, values: np.ndarray, block: float = 10,
+                 stationary: bool = True, seed: int | None = None, chunk: int = 2000):
+        self.log_returns = log_returns
+        self.values = values # current value of every asset
+        self.block = block
+        self.stationary = stationary
+        self.rng = np.random.default_rng(seed)
+        self.chunk = chunk
+
+    def indices(self, horizon: int, paths: int) -> np.ndarray:
+        days = len(self.log_returns)
+        if self.stationary:
+            return stationary_bootstrap_indices(days, horizon, paths, self.block, self.rng)
+        return block_bootstrap_indices(days, horizon, paths, min(int(self.block), days), self.rng)
+
+    def simulate(self, horizon: int, paths: int) -> np.ndarray:
+        """Final value of the portfolio on every path, holding the current shares."""
+        check_simulation_size(horizon, paths)
+
+        # the sum over a run of consecutive days is a difference of two cumulative sums
+        cumulative = np.concatenate([np.zeros((1, self.log_returns.shape[1])), np.cumsum(self.log_returns, axis=0)])
+
+        final_values = np.empty(paths)
+        for start in range(0, paths, self.chunk):
+            size = min(self.chunk, paths - start)
+            indices = self.indices(horizon, size)
+
+            # runs start at the beginning of every path and wherever the next day is not the following one
+            run_start = np.ones(indices.shape, dtype=bool)
+            run_start[:, 1:] = indices[:, 1:] != indices[:, :-1] + 1
+            run_end = np.ones(indices.shape, dtype=bool)
+            run_end[:, :-1] = run_start[:, 1:]
+
+            runs = cumulative[indices[run_end] + 1] - cumulative[indices[run_start]]
+            runs_per_path = run_start.sum(axis=1)
+            growth = np.exp(np.add.reduceat(runs, np.cumsum(runs_per_path) - runs_per_path, axis=0))
+            final_values[start:start + size] = growth @ self.values
+        return final_values
+
+    def sample_paths(self, horizon: int, paths: int) -> np.ndarray:
+        """Value of the portfolio on every day of a few paths (horizon x paths) for charts."""
+        check_simulation_size(horizon, paths)
+        growth = np.exp(np.cumsum(self.log_returns[self.indices(horizon, paths)], axis=1))
+        paths_values = np.concatenate([np.full((paths, 1), self.values.sum()), growth @ self.values], axis=1)
+        return paths_values.T
+
+    def evaluate(self, horizon: int, paths: int, confidence: float = 0.95) -> dict:
+        return statistics(self.values.sum(), self.simulate(horizon, paths), confidence)
+
+
+def statistics(initial_value: float, final_values: np.ndarray, confidence: float = 0.95) -> dict:
+    """Summary of simulated final values of a portfolio with value at risk and expected shortfall."""
+    losses = initial_value - final_values
+    var = np.percentile(losses, confidence * 100)
+    tail = losses[losses >= var]
+    return {
+        'mean': final_values.mean(),
+        'worst_case': np.percentile(final_values, 5),
+        'best_case': np.percentile(final_values, 95),
+        'std_dev': np.std(final_values),
+        'var': var,
+        'cvar': tail.mean() if len(tail) else var,
+        'risk': (losses > 0).mean() * 100,
+    }
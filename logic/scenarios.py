@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from logic.config import config
+
+SHOCK_LEVELS = (-0.1, -0.2, -0.3, -0.4, -0.5)
+
+
+class ScenarioSet:
+    """Deterministic scenarios expressed as daily returns of every asset of a portfolio.
+
+    Scenarios of the same length are stacked into one array (scenarios x days x assets), so one-day shocks
+    and multi-month crisis replays are kept apart instead of padding every shock to the longest replay.
+    """
+
+    def __init__(self, abbrevs: list[str]):
+        self.abbrevs = abbrevs
+        self.groups = {} # days: (names, list of return arrays)
+
+    def __len__(self):
+        return sum(len(names) for names, _ in self.groups.values())
+
+    def add(self, name: str, returns: np.ndarray) -> None:
+        """Add a scenario given as daily returns (days x assets)."""
+        names, paths = self.groups.setdefault(len(returns), ([], []))
+        names.append(name)
+        paths.append(np.asarray(returns, dtype=float)[np.newaxis])
+
+    def add_shocks(self, names: list[str], shocks: np.ndarray) -> None:
+        """Add one-day scenarios given as a matrix of returns (scenarios x assets)."""
+        group_names, paths = self.groups.setdefault(1, ([], []))
+        group_names.extend(names)
+        paths.append(np.asarray(shocks, dtype=float)[:, np.newaxis, :])
+
+    def batches(self):
+        """Names and stacked returns (scenarios x days x assets) of every length of scenarios."""
+        for names, paths in self.groups.values():
+            yield names, np.concatenate(paths)
+
+
+def evaluate(returns: np.ndarray, values: np.ndarray, purchases: np.ndarray, periods: np.ndarray) -> dict:
+    """Outcome of scenarios of the same length for holdings and periodic purchases.
+
+    `values` is the current value of the held shares of every asset, `purchases` the value of the shares
+    bought periodically at current prices and `periods` the number of trading days between the purchases
+    (0 when an asset is not bought periodically).
+    """
+    days = returns.shape[1]
+    growth = np.cumprod(1 + returns, axis=1)
+
+    # purchases on every day of the scenario at current prices
+    bought = np.zeros((days, len(values)))
+    for col in np.flatnonzero(periods):
+        bought[periods[col] - 1::periods[col], col] = purchases[col]
+
+    # money spent and value held on every day
+    spent = values.sum() + np.cumsum(np.einsum('sda,da->sd', growth, bought), axis=1)
+    held = np.einsum('sda,a->sd', growth, values) + np.einsum('sda,da->sd', growth, np.cumsum(bought, axis=0))
+
+    loss = spent[:, -1] - held[:, -1]
+    return {
+        'loss': loss,
+        'loss_percentage': loss / spent[:, -1] * 100,
+        'worst_loss': (spent - held).max(axis=1),
+        'final_value': held[:, -1],
+    }
+
+
+def historical_returns(assets: list, start_date, end_date) -> np.ndarray | None:
+    """Daily total returns of every asset during a past period (days x assets).
+
+    Assets without data in the period follow the average return of the assets that have it, None is
+    returned when no asset has data.
+    """
+    returns = pd.DataFrame({asset.abbrev: asset.get_column('Total Return').pct_change()
+                            for asset in assets}).loc[start_date:end_date]
+    returns = returns.dropna(how='all')
+    if returns.empty:
+        return None
+
+    average = returns.mean(axis=1)
+    return returns.apply(lambda column: column.fillna(average)).to_numpy()
+
+
+def crisis_scenarios(scenarios: ScenarioSet, assets: list) -> None:
+    """Replay the crises in CRISES with the returns the assets had at the time."""
+    for name, (start_date, end_date) in config['CRISES'].items():
+        returns = historical_returns(assets, start_date, end_date)
+        if returns is not None:
+            scenarios.add(name, returns)
+
+
+def sector_scenarios(scenarios: ScenarioSet, sectors: list[str], levels=SHOCK_LEVELS) -> None:
+    """Shock all assets of one sector by the same return, for every sector and level."""
+    sectors = np.array(sectors)
+    unique_sectors = np.unique(sectors)
+    in_sector = sectors[np.newaxis, :] == unique_sectors[:, np.newaxis] # sectors x assets
+
+    shocks = (in_sector[np.newaxis, :, :] * np.array(levels)[:, np.newaxis, np.newaxis]).reshape(-1, len(sectors))
+    names = [f'{sector} {level * 100:.0f} %' for level in levels for sector in unique_sectors]
+    scenarios.add_shocks(names, shocks)
+
+
+def asset_scenarios(scenarios: ScenarioSet, shocks: dict[str, float], name: str = 'Custom') -> None:
+    """Shock single assets given as {abbreviation: return}, the other assets do not change."""
+    row = np.array([shocks.get(abbrev, 0.0) for abbrev in scenarios.abbrevs])
+    scenarios.add_shocks([name], row[np.newaxis])
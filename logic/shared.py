@@ -0,0 +1,147 @@
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+from logic import backtest, risk
+from logic.config import config
+
+MAX_ATTACHED = 4 # matrices a worker keeps attached
+
+
+class SharedMatrix:
+    """Matrix published once into shared memory so worker processes can read it without copies.
+
+    Workers get a small descriptor (name, shape, dtype and the dates of the rows) instead of the data
+    and attach to the same memory with `attach`. The process that published the matrix owns the memory
+    and frees it with `close`.
+    """
+
+    def __init__(self, matrix: np.ndarray, dates: pd.DatetimeIndex | None = None):
+        matrix = np.ascontiguousarray(matrix)
+        self.memory = SharedMemory(create=True, size=max(matrix.nbytes, 1))
+        self.matrix = np.ndarray(matrix.shape, matrix.dtype, buffer=self.memory.buf)
+        self.matrix[...] = matrix
+
+        self.descriptor = {
+            'name': self.memory.name,
+            'shape': matrix.shape,
+            'dtype': matrix.dtype.str,
+            'dates': None if dates is None else dates.to_numpy(dtype='datetime64[D]'),
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        self.matrix = None
+        self.memory.close()
+        self.memory.unlink()
+
+
+# matrices attached in this worker, name: (shared memory, matrix)
+_attached = OrderedDict()
+
+
+def attach(descriptor: dict) -> np.ndarray:
+    """Read-only view of a published matrix, attached once per worker."""
+    name = descriptor['name']
+    if name in _attached:
+        _attached.move_to_end(name)
+        return _attached[name][1]
+
+    try:
+        # the publishing process owns the memory, it must not be freed when this worker exits
+        memory = SharedMemory(name=name, track=False)
+    except TypeError:
+        # before Python 3.13 workers share the resource tracker of the publishing process, which frees
+        # the memory once when it is unlinked there
+        memory = SharedMemory(name=name)
+    matrix = np.ndarray(descriptor['shape'], np.dtype(descriptor['dtype']), buffer=memory.buf)
+    matrix.flags.writeable = False
+    _attached[name] = (memory, matrix)
+
+    while len(_attached) > MAX_ATTACHED:
+        _, (old_memory, _) = _attached.popitem(last=False)
+        old_memory.close()
+    return matrix
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Worker processes kept for the whole session, so later tasks do not pay for starting them."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # forking a process with Qt and quote threads running is unsafe
+            _pool = ProcessPoolExecutor(config['WORKERS'], mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def _ready() -> None:
+    pass
+
+
+def warm_pool() -> None:
+    """Start the worker processes in a background thread, they import numpy and pandas before the first task."""
+    if config['WORKERS'] <= 1:
+        return
+
+    def start_workers():
+        pool = get_pool()
+        # every task waiting for a worker starts a new process until all of them run
+        for future in [pool.submit(_ready) for _ in range(config['WORKERS'])]:
+            future.result()
+
+    threading.Thread(target=start_workers, daemon=True).start()
+
+
+def _bootstrap_worker(descriptor: dict, values: np.ndarray, block: float, stationary: bool,
+                      horizon: int, paths: int, seed: int) -> np.ndarray:
+    bootstrap = risk.BootstrapRisk(attach(descriptor), values, block, stationary, seed)
+    return bootstrap.simulate(horizon, paths)
+
+
+def parallel_bootstrap(log_returns: SharedMatrix, values: np.ndarray, horizon: int, paths: int,
+                       block: float = 10, stationary: bool = True) -> np.ndarray:
+    """Final values of bootstrap simulations split between the worker processes."""
+    workers = config['WORKERS']
+    sizes = [paths // workers + (worker < paths % workers) for worker in range(workers)]
+    seeds = np.random.SeedSequence().generate_state(workers)
+    futures = [get_pool().submit(_bootstrap_worker, log_returns.descriptor, values, block, stationary,
+                                 horizon, size, int(seed))
+               for size, seed in zip(sizes, seeds) if size]
+    return np.concatenate([future.result() for future in futures])
+
+
+def _backtest_worker(descriptor: dict, weights: np.ndarray, initial_value: float, combinations: list,
+                     proportional_cost: float, fixed_cost: float) -> list[dict]:
+    prices = attach(descriptor)
+    rows = []
+    for frequency, threshold in combinations:
+        rebalancing = backtest.RebalancingBacktest(prices, weights, frequency, threshold, proportional_cost, fixed_cost)
+        rows.append({'frequency': frequency, 'threshold': threshold, **backtest.summarize(rebalancing.run(initial_value))})
+    return rows
+
+
+def parallel_grid_search(prices: SharedMatrix, weights: np.ndarray, initial_value: float,
+                         frequencies: list[int | None], thresholds: list[float],
+                         proportional_cost: float = 0.0, fixed_cost: float = 0.0) -> pd.DataFrame:
+    """Same as `backtest.grid_search` with the combinations split between the worker processes."""
+    combinations = [(frequency, threshold) for frequency in frequencies for threshold in thresholds]
+    workers = config['WORKERS']
+    futures = [get_pool().submit(_backtest_worker, prices.descriptor, weights, initial_value,
+                                 combinations[worker::workers], proportional_cost, fixed_cost)
+               for worker in range(workers) if combinations[worker::workers]]
+    rows = [row for future in futures for row in future.result()]
+    return pd.DataFrame(rows).sort_values('final_value', ascending=False, ignore_index=True)
@@ -1,5 +1,7 @@
 import sqlite3 as sq
 
+import pandas as pd
+
 from logic.utils import transform_dataframe_for_storage, transform_dataframe_for_usage
 
 
@@ -22,10 +24,35 @@ class SQLiteConnector:
                 close REAL DEFAULT 0,
                 volume INTEGER DEFAULT 0,
                 dividends REAL DEFAULT 0,
-                stock_splits REAL DEFAULT 0
+                stock_splits REAL DEFAULT 0,
+                total_return REAL
             )
         """)
 
+        # databases created before the total return index was stored have closes adjusted for dividends,
+        # their histories are removed so they are downloaded again with the raw closes the index needs
+        columns = [column[1] for column in self.cursor.execute('PRAGMA table_info(historical)')]
+        if 'total_return' not in columns:
+            self.cursor.execute('ALTER TABLE historical ADD COLUMN total_return REAL')
+            self.cursor.execute('DELETE FROM historical')
+
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS historical_name_date ON historical (name, date)')
+
+        # bars of all resolutions except daily, clustered by asset and resolution so a window is one range read
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bars (
+                name TEXT NOT NULL,
+                resolution TEXT NOT NULL,
+                time TEXT NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume INTEGER DEFAULT 0,
+                PRIMARY KEY (name, resolution, time)
+            ) WITHOUT ROWID
+        """)
+
         self.cursor.execute("""
             CREATE TABLE IF NOT EXISTS assets (
                 id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
@@ -34,6 +61,41 @@ class SQLiteConnector:
             )
         """)
 
+        # the sector is stored once it is known so stress tests do not ask yfinance for it every time
+        columns = [column[1] for column in self.cursor.execute('PRAGMA table_info(assets)')]
+        if 'sector' not in columns:
+            self.cursor.execute('ALTER TABLE assets ADD COLUMN sector TEXT')
+
+        # directory of known symbols for searches, filled from listing files and every downloaded asset
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS symbols (
+                abbreviation TEXT NOT NULL PRIMARY KEY,
+                name TEXT
+            ) WITHOUT ROWID
+        """)
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS listings (
+                path TEXT NOT NULL PRIMARY KEY,
+                modified REAL
+            )
+        """)
+        self.cursor.execute("""
+            INSERT OR IGNORE INTO symbols (abbreviation, name)
+            SELECT abbreviation, short_name FROM assets
+        """)
+
+        # how often and when symbols were opened, kind is search or portfolio
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS usage (
+                abbreviation TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                count INTEGER DEFAULT 0,
+                last_used TEXT,
+                PRIMARY KEY (abbreviation, kind)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
         # TODO profile data
 
     def __del__(self):
@@ -43,6 +105,22 @@ class SQLiteConnector:
     def insert_into_db(self, abbrev, history, info):
         # insert historical data
         # transform dataframe into suitable form
+        self.insert_history(abbrev, history)
+
+        # insert asset info
+        # values = tuple(info.itertuples(index=False, name=None))
+        # print(type(info.itertuples(index=False, name=None)))
+        # assets downloaded again keep their row
+        self.cursor.execute("""
+            INSERT INTO assets (abbreviation, short_name)
+            SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM assets WHERE abbreviation = ?)
+        """, (abbrev, info, abbrev))
+        self.cursor.execute('INSERT OR IGNORE INTO symbols (abbreviation, name) VALUES (?, ?)', (abbrev, info))
+
+        self.conn.commit()
+
+    def insert_history(self, abbrev, history):
+        """Insert rows of historical data, the total return index must already be calculated."""
         history = transform_dataframe_for_storage(history, abbrev)
         values = [(row.Date,
                    row.Name,
@@ -52,27 +130,201 @@ class SQLiteConnector:
                    row.Close,
                    row.Volume,
                    row.Dividends,
-                   row.Stock_Splits) for row in history.itertuples(index=False)]
+                   row.Stock_Splits,
+                   row.Total_Return) for row in history.itertuples(index=False)]
 
         self.cursor.executemany("""
             INSERT INTO historical
-            (date, name, open, high, low, close, volume, dividends, stock_splits)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            (date, name, open, high, low, close, volume, dividends, stock_splits, total_return)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, values)
 
-        # insert asset info
-        # values = tuple(info.itertuples(index=False, name=None))
-        # print(type(info.itertuples(index=False, name=None)))
-        self.cursor.execute(f"""INSERT INTO assets (abbreviation, short_name) VALUES ('{abbrev}', '{info}')""")
+    def begin_bulk_import(self, abbrevs):
+        """Remove the history of the imported assets and drop the index until `end_bulk_import`.
 
+        Everything until `end_bulk_import` is one transaction, which is much faster than keeping the index
+        up to date with every inserted row. Weekly bars are rolled up from the history, they are removed too
+        and rolled up again from the imported one when the assets are opened.
+        """
+        self.cursor.execute('PRAGMA synchronous = OFF')
+        self.cursor.executemany('DELETE FROM historical WHERE name = ?', [(abbrev,) for abbrev in abbrevs])
+        self.cursor.executemany("DELETE FROM bars WHERE name = ? AND resolution = '1w'",
+                                [(abbrev,) for abbrev in abbrevs])
+        self.cursor.execute('DROP INDEX IF EXISTS historical_name_date')
+
+    def insert_history_rows(self, rows):
+        """Insert rows (date, name, open, high, low, close, volume, dividends, stock splits, total return)."""
+        self.cursor.executemany("""
+            INSERT INTO historical
+            (date, name, open, high, low, close, volume, dividends, stock_splits, total_return)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+    def end_bulk_import(self, names):
+        """Rebuild the index, record the imported assets given as {abbreviation: name} and commit."""
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS historical_name_date ON historical (name, date)')
+        self.cursor.executemany("""
+            INSERT INTO assets (abbreviation, short_name)
+            SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM assets WHERE abbreviation = ?)
+        """, [(abbrev, name, abbrev) for abbrev, name in names.items()])
+        self.cursor.executemany('INSERT OR IGNORE INTO symbols (abbreviation, name) VALUES (?, ?)', names.items())
+        self.conn.commit()
+        self.cursor.execute('PRAGMA synchronous = FULL')
+
+    def abort_bulk_import(self):
+        """Undo everything since `begin_bulk_import`, including the dropped index."""
+        self.conn.rollback()
+        self.cursor.execute('PRAGMA synchronous = FULL')
+
+    def get_stored_abbrevs(self):
+        self.cursor.execute('SELECT DISTINCT name FROM historical ORDER BY name')
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def get_asset_names(self):
+        self.cursor.execute('SELECT abbreviation, short_name FROM assets')
+        return dict(self.cursor.fetchall())
+
+    def append_history(self, abbrev, history):
+        """Insert days that are newer than the stored ones."""
+        self.insert_history(abbrev, history)
+        self.conn.commit()
+
+    def apply_quotes(self, quotes):
+        """Update stored days with live quotes (abbreviation, day, price, volume) in one transaction.
+
+        Only the close, high, low, volume and total return of the day change. The total return follows
+        the new close from the previous stored day.
+        """
+        self.cursor.executemany("""
+            UPDATE historical
+            SET close = :price, high = MAX(high, :price), low = MIN(low, :price), volume = volume + :volume,
+                total_return = COALESCE((
+                    SELECT previous.total_return * (:price + historical.dividends) / previous.close
+                    FROM historical AS previous
+                    WHERE previous.name = historical.name AND previous.date < historical.date
+                    ORDER BY previous.date DESC
+                    LIMIT 1
+                ), total_return)
+            WHERE name = :name AND date = :date
+        """, [{'name': abbrev, 'date': day.strftime('%Y-%m-%d'), 'price': price, 'volume': volume}
+              for abbrev, day, price, volume in quotes])
+        self.conn.commit()
+
+    def upsert_bars(self, abbrev, resolution, bars):
+        """Insert bars of a resolution, replacing the ones that already exist."""
+        values = [(abbrev, resolution, time.strftime('%Y-%m-%d %H:%M:%S'), *row)
+                  for time, row in zip(bars.index, bars[['Open', 'High', 'Low', 'Close', 'Volume']].itertuples(
+                      index=False, name=None))]
+
+        self.cursor.executemany("""
+            INSERT OR REPLACE INTO bars (name, resolution, time, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, values)
+        self.conn.commit()
+
+    def get_bars(self, abbrev, resolution, start=None) -> pd.DataFrame:
+        """Get bars of a resolution from a point in time onwards."""
+        start = start.strftime('%Y-%m-%d %H:%M:%S') if start is not None else ''
+        self.cursor.execute("""
+            SELECT time, open, high, low, close, volume
+            FROM bars
+            WHERE name = ? AND resolution = ? AND time >= ?
+            ORDER BY time
+        """, (abbrev, resolution, start))
+
+        bars = pd.DataFrame(self.cursor.fetchall(), columns=('Date', 'Open', 'High', 'Low', 'Close', 'Volume'))
+        bars['Date'] = pd.to_datetime(bars['Date'], format='%Y-%m-%d %H:%M:%S')
+        return bars.set_index('Date')
+
+    def get_daily_bars(self, abbrev, start) -> pd.DataFrame:
+        """Get the stored days of an asset from a day onwards as bars."""
+        self.cursor.execute("""
+            SELECT date, open, high, low, close, volume
+            FROM historical
+            WHERE name = ? AND date >= ?
+            ORDER BY date
+        """, (abbrev, start.strftime('%Y-%m-%d')))
+
+        bars = pd.DataFrame(self.cursor.fetchall(), columns=('Date', 'Open', 'High', 'Low', 'Close', 'Volume'))
+        bars['Date'] = pd.to_datetime(bars['Date'], format='%Y-%m-%d')
+        return bars.set_index('Date')
+
+    def get_last_bar_time(self, abbrev, resolution):
+        self.cursor.execute('SELECT MAX(time) FROM bars WHERE name = ? AND resolution = ?', (abbrev, resolution))
+        time = self.cursor.fetchone()[0]
+        return pd.Timestamp(time) if time else None
+
+    def get_symbols(self) -> list[tuple[str, str]]:
+        self.cursor.execute('SELECT abbreviation, name FROM symbols ORDER BY abbreviation')
+        return self.cursor.fetchall()
+
+    def insert_symbols(self, symbols, path=None, modified=None):
+        """Insert or rename symbols given as (abbreviation, name), recording the listing file they came from."""
+        self.cursor.executemany('INSERT OR REPLACE INTO symbols (abbreviation, name) VALUES (?, ?)', symbols)
+        if path is not None:
+            self.cursor.execute('INSERT OR REPLACE INTO listings (path, modified) VALUES (?, ?)', (path, modified))
+        self.conn.commit()
+
+    def get_listing_modified(self, path):
+        """Modification time of a listing file when it was imported, None if it never was."""
+        self.cursor.execute('SELECT modified FROM listings WHERE path = ?', (path,))
+        modified = self.cursor.fetchone()
+        return modified[0] if modified else None
+
+    def has_listings(self) -> bool:
+        self.cursor.execute('SELECT EXISTS (SELECT 1 FROM listings)')
+        return bool(self.cursor.fetchone()[0])
+
+    def record_usage(self, abbrev, kind):
+        self.cursor.execute("""
+            INSERT INTO usage (abbreviation, kind, count, last_used) VALUES (?, ?, 1, datetime('now'))
+            ON CONFLICT (abbreviation, kind) DO UPDATE SET count = count + 1, last_used = excluded.last_used
+        """, (abbrev, kind))
+        self.conn.commit()
+
+    def get_recent_symbols(self, kind, limit):
+        self.cursor.execute("""
+            SELECT abbreviation FROM usage WHERE kind = ? ORDER BY last_used DESC LIMIT ?
+        """, (kind, limit))
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def get_frequent_symbols(self, limit):
+        self.cursor.execute("""
+            SELECT abbreviation FROM usage GROUP BY abbreviation ORDER BY SUM(count) DESC LIMIT ?
+        """, (limit,))
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def get_last_day(self, abbrev):
+        """Date, close and total return of the last stored day of an asset, None if nothing is stored."""
+        self.cursor.execute("""
+            SELECT date, close, total_return FROM historical WHERE name = ? ORDER BY date DESC LIMIT 1
+        """, (abbrev,))
+        last_day = self.cursor.fetchone()
+        if last_day is None:
+            return None
+        return pd.Timestamp(last_day[0]), last_day[1], last_day[2]
+
+    def get_sector(self, abbrev):
+        """Stored sector of an asset, None if it was never downloaded."""
+        self.cursor.execute('SELECT sector FROM assets WHERE abbreviation = ?', (abbrev,))
+        sector = self.cursor.fetchone()
+        return sector[0] if sector else None
+
+    def set_sector(self, abbrev, sector):
+        self.cursor.execute('UPDATE assets SET sector = ? WHERE abbreviation = ?', (sector, abbrev))
+        self.cursor.execute("""
+            INSERT INTO assets (abbreviation, sector)
+            SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM assets WHERE abbreviation = ?)
+        """, (abbrev, sector, abbrev))
         self.conn.commit()
 
     def get_data_if_exists(self, asset_abbr):
         # get data from sqlite
         self.cursor.execute(f"""
-            SELECT name, date, open, high, low, close, volume, dividends, stock_splits
+            SELECT name, date, open, high, low, close, volume, dividends, stock_splits, total_return
             FROM historical 
             WHERE name='{asset_abbr}'
+            ORDER BY date
         """)
         history = self.cursor.fetchall()
 
@@ -0,0 +1,124 @@
+import bisect
+import os
+import string
+
+import pandas as pd
+
+from logic.config import config
+from logic.sqlite_connector import sqlite
+
+# characters that appear in symbols, used to generate the symbols one typo away from a search
+SYMBOL_CHARACTERS = string.ascii_uppercase + string.digits + '.-^='
+
+
+class SymbolIndex:
+    """Directory of known symbols kept in memory as sorted lists for prefix and fuzzy searches.
+
+    Symbols come from the `symbols` table, which holds every downloaded asset and the contents of
+    imported listing files. Searches never touch the database or the network.
+    """
+
+    def __init__(self):
+        self.names = {} # abbreviation: name
+        self.abbrevs = [] # sorted abbreviations
+        self.words = [] # sorted (word of a name, abbreviation)
+        self.complete = False # whether unknown symbols can be rejected
+        self.load()
+
+    def load(self) -> None:
+        """Read all symbols from the database, importing the configured listing file if it changed."""
+        path = config['SYMBOL_LISTING']
+        if path and os.path.exists(path) and sqlite.get_listing_modified(path) != os.path.getmtime(path):
+            try:
+                self._store_listing(path)
+            except ValueError as e:
+                print(e)
+
+        self.names = dict(sqlite.get_symbols())
+        self.abbrevs = sorted(self.names)
+        self.words = sorted((word, abbrev) for abbrev, name in self.names.items() for word in self._words(name))
+        self.complete = sqlite.has_listings()
+
+    def import_listing(self, path: str) -> None:
+        """Add the symbols of a listing file with a symbol column and optionally a name column.
+
+        Comma separated files and the pipe separated listings of exchanges both work.
+        """
+        self._store_listing(path)
+        self.load()
+
+    @staticmethod
+    def _store_listing(path: str) -> None:
+        with open(path) as file:
+            separator = '|' if '|' in file.readline() else ','
+        listing = pd.read_csv(path, sep=separator, dtype=str)
+
+        columns = {column.strip().lower(): column for column in listing.columns}
+        symbol_column = next((columns[name] for name in ('symbol', 'ticker', 'act symbol', 'abbreviation')
+                              if name in columns), None)
+        if symbol_column is None:
+            raise ValueError(f'No symbol column in {path}')
+        name_column = next((columns[name] for name in ('name', 'security name', 'company name', 'short_name')
+                            if name in columns), None)
+
+        symbols = listing[symbol_column].str.strip().str.upper()
+        names = listing[name_column].fillna('') if name_column else pd.Series('', index=listing.index)
+        valid = symbols.notna() & (symbols != '')
+        sqlite.insert_symbols(list(zip(symbols[valid], names[valid])), path, os.path.getmtime(path))
+
+    def add(self, abbrev: str, name: str) -> None:
+        """Remember a symbol that was found remotely."""
+        if abbrev in self.names:
+            return
+        self.names[abbrev] = name
+        bisect.insort(self.abbrevs, abbrev)
+        for word in self._words(name):
+            bisect.insort(self.words, (word, abbrev))
+
+    def resolve(self, text: str) -> str | None:
+        """Symbol for the text of a search box, None if it is certainly not a known symbol."""
+        abbrev = text.split(' - ')[0].strip().upper()
+        if not abbrev:
+            return None
+        if abbrev in self.names or not self.complete:
+            return abbrev
+        return None
+
+    def search(self, text: str, limit: int = 10) -> list[str]:
+        """Symbols starting with the text, then symbols whose name has a word starting with it, then
+        symbols one typo away from it."""
+        text = text.split(' - ')[0].strip().upper()
+        if not text:
+            return []
+
+        start = bisect.bisect_left(self.abbrevs, text)
+        found = dict.fromkeys(abbrev for abbrev in self.abbrevs[start:start + limit] if abbrev.startswith(text))
+        if len(found) < limit:
+            start = bisect.bisect_left(self.words, (text,))
+            found.update(dict.fromkeys(abbrev for word, abbrev in self.words[start:start + limit * 4]
+                                       if word.startswith(text)))
+        if len(found) < limit:
+            found.update(dict.fromkeys(sorted(self._edits(text) & self.names.keys())))
+        return list(found)[:limit]
+
+    def describe(self, abbrev: str) -> str:
+        """Text shown for a symbol in completions."""
+        name = self.names.get(abbrev)
+        return f'{abbrev} - {name}' if name else abbrev
+
+    @staticmethod
+    def _words(name: str) -> list[str]:
+        return [word for word in str(name or '').upper().replace(',', ' ').split() if len(word) > 1]
+
+    @staticmethod
+    def _edits(text: str) -> set[str]:
+        """Every text with one character deleted, replaced, inserted or two neighbours swapped."""
+        splits = [(text[:i], text[i:]) for i in range(len(text) + 1)]
+        deletes = [left + right[1:] for left, right in splits if right]
+        swaps = [left + right[1] + right[0] + right[2:] for left, right in splits if len(right) > 1]
+        replaces = [left + c + right[1:] for left, right in splits if right for c in SYMBOL_CHARACTERS]
+        inserts = [left + c + right for left, right in splits for c in SYMBOL_CHARACTERS]
+        return set(deletes + swaps + replaces + inserts)
+
+
+symbols = SymbolIndex()
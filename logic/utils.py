@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 
+from logic.config import config
+
 
 def calc_window_size(app):
     """Calculate window size and return a list [x, y, width, height]."""
@@ -20,12 +23,55 @@ def transform_dataframe_for_storage(dataframe: pd.DataFrame, abbrev: str) -> pd.
     dataframe['Date'] = dataframe['Date'].dt.strftime('%Y-%m-%d')
     dataframe.fillna({'Dividends': 0, 'Stock Splits': 0}, inplace=True)
     dataframe['Name'] = [abbrev] * len(dataframe)
-    dataframe = dataframe.rename(columns={'Stock Splits': 'Stock_Splits'})
+    dataframe = dataframe.rename(columns={'Stock Splits': 'Stock_Splits', 'Total Return': 'Total_Return'})
     return dataframe
 
 def transform_dataframe_for_usage(dataframe: list) -> pd.DataFrame:
     dataframe = pd.DataFrame(dataframe, columns=(
-        'Name', 'Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits'))
+        'Name', 'Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits', 'Total Return'))
     dataframe['Date'] = pd.to_datetime(dataframe['Date'], format='%Y-%m-%d')
     dataframe.set_index('Date', inplace=True)
-    return dataframe
\ No newline at end of file
+    return dataframe
+
+def calc_total_return(history: pd.DataFrame, previous: tuple[float, float] | None = None) -> np.ndarray:
+    """Calculate the total return index of an asset with reinvested dividends.
+
+    The index starts at 1 and grows with the daily return of holding the asset. Closes and dividends
+    from yfinance are already adjusted for stock splits, so splits do not change the index. When new days
+    are appended it is continued from `previous` (last close, last index value) so older days never change.
+    """
+    close = history['Close'].to_numpy(dtype=float)
+    if not len(close):
+        return np.empty(0)
+
+    dividends = history['Dividends'].fillna(0).to_numpy(dtype=float)
+
+    previous_close = np.concatenate(([previous[0] if previous else close[0]], close[:-1]))
+    growth = (close + dividends) / previous_close
+    if not previous:
+        growth[0] = 1
+
+    return (previous[1] if previous else 1.0) * np.cumprod(growth)
+
+def choose_resolution(period: int) -> str:
+    """Choose the coarsest resolution that still has enough bars in a period of days."""
+    for resolution, bars_per_day in reversed(config['RESOLUTIONS'].items()):
+        intraday = resolution in ('5m', '1h')
+        if intraday and period > config['INTRADAY_DAYS']:
+            continue
+        if bars_per_day * period >= config['MIN_CHART_POINTS']:
+            return resolution
+    return next(iter(config['RESOLUTIONS']))
+
+def resample_bars(bars: pd.DataFrame, resolution: str) -> pd.DataFrame:
+    """Roll up OHLCV bars into a coarser resolution, every bar is labelled with its start."""
+    rule = {'1h': '1h', '1d': '1D', '1w': 'W-MON'}[resolution]
+    bars = bars.resample(rule, label='left', closed='left').agg(
+        {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
+    return bars.dropna(subset=['Close'])
+
+def bar_start(time: pd.Timestamp, resolution: str) -> pd.Timestamp:
+    """Get the start of the bar a point in time belongs to."""
+    if resolution == '1w':
+        return time.to_period('W-SUN').start_time
+    return time.floor({'1h': '1h', '1d': '1D'}[resolution])
@@ -0,0 +1,307 @@
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean of every window of consecutive values calculated from cumulative sums."""
+    if len(values) < window:
+        return np.empty(0)
+    sums = np.cumsum(np.insert(values, 0, 0.0))
+    return (sums[window:] - sums[:-window]) / window
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """Sample standard deviation of every window of consecutive values."""
+    mean = rolling_mean(values, window)
+    mean_of_squares = rolling_mean(values ** 2, window)
+    variance = (mean_of_squares - mean ** 2) * window / (window - 1)
+    return np.sqrt(np.maximum(variance, 0))
+
+
+def _matrix(name: str) -> property:
+    """Days x assets part of a matrix that has room for more days and assets."""
+    def get(self) -> np.ndarray:
+        return getattr(self, name)[:len(self.dates), :len(self.abbrevs)]
+
+    def set(self, value: np.ndarray) -> None:
+        setattr(self, name, value)
+
+    return property(get, set)
+
+
+class EquityCurve:
+    """Daily value of a portfolio kept up to date incrementally.
+
+    Close prices of the holdings are aligned into one matrix (days x assets) and the value of each day is
+    the product of its price row and the shares held on that day. Periodic purchases add shares over time
+    and are recorded as cash flows, so they are not counted as returns. The matrices keep spare rows and
+    columns, so new days and assets are usually written in place instead of copying them.
+    """
+
+    prices = _matrix('_prices')
+    holdings = _matrix('_holdings')
+    purchases = _matrix('_purchases') # money spent on periodic purchases
+
+    def __init__(self, portfolio):
+        self.portfolio = portfolio
+
+        self.abbrevs = []
+        self.dates = pd.DatetimeIndex([])
+        self.shares = np.empty(0) # static shares of every column
+        self.prices = np.empty((0, 0))
+        self.holdings = np.empty((0, 0))
+        self.purchases = np.empty((0, 0))
+        self.cash_flows = np.empty(0)
+        self.values = np.empty(0)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def rebuild(self) -> None:
+        """Align all holdings from scratch."""
+        assets = self.portfolio.get_assets()
+        self.abbrevs = [asset.abbrev for asset in assets]
+
+        if not assets:
+            self.__init__(self.portfolio)
+            return
+
+        # the curve starts when every asset has data
+        start = max(asset.data.first_date() for asset in assets)
+        dates = pd.DatetimeIndex([])
+        for asset in assets:
+            asset_dates = asset.get_dates()
+            dates = dates.union(asset_dates[asset_dates >= start])
+        self.dates = dates
+
+        self.prices = np.column_stack([self._align(asset) for asset in assets])
+        columns = [self._holdings_column(asset, self.prices[:, col]) for col, asset in enumerate(assets)]
+        self.shares = np.array([self.portfolio.static_assets[asset] for asset in assets], dtype=float)
+        self.holdings = np.column_stack([column[0] for column in columns])
+        self.purchases = np.column_stack([column[1] for column in columns])
+
+        self.cash_flows = self.purchases.sum(axis=1)
+        self.values = np.einsum('ij,ij->i', self.prices, self.holdings)
+
+    def update_holding(self, asset) -> None:
+        """Update the curve after shares or periodic buying of an asset changed."""
+        if asset.abbrev not in self.abbrevs:
+            self._add_column(asset)
+            return
+
+        col = self.abbrevs.index(asset.abbrev)
+        shares, purchases = self._holdings_column(asset, self.prices[:, col])
+
+        # only the contribution of the changed column is recalculated
+        self.values += self.prices[:, col] * (shares - self.holdings[:, col])
+        self.cash_flows += purchases - self.purchases[:, col]
+        self.holdings[:, col] = shares
+        self.purchases[:, col] = purchases
+        self.shares[col] = self.portfolio.static_assets[asset]
+
+    def remove_holding(self, asset) -> None:
+        """Remove an asset that is no longer in the portfolio."""
+        if asset.abbrev not in self.abbrevs:
+            return
+
+        if not self.portfolio.static_assets:
+            self.rebuild()
+            return
+
+        col = self.abbrevs.index(asset.abbrev)
+        first_date = asset.data.first_date()
+        self.values -= self.prices[:, col] * self.holdings[:, col]
+        self.cash_flows -= self.purchases[:, col]
+
+        # the columns after the removed one are moved to its place
+        for matrix in (self.prices, self.holdings, self.purchases):
+            matrix[:, col:-1] = matrix[:, col + 1:]
+        del self.abbrevs[col]
+        self.shares = np.delete(self.shares, col)
+
+        # the removed asset may have been the one with the shortest history
+        if first_date == self.dates[0]:
+            self.rebuild()
+
+    def append_bar(self, date: pd.Timestamp, closes: dict[str, float]) -> None:
+        """Add a new day of close prices given as {abbreviation: close}."""
+        if not self.abbrevs or date <= self.dates[-1]:
+            return
+
+        # missing prices are carried forward from the previous day
+        prices = np.array([closes.get(abbrev, np.nan) for abbrev in self.abbrevs])
+        prices = np.where(np.isnan(prices), self.prices[-1], prices)
+
+        holdings = self.holdings[-1].copy()
+        purchases = np.zeros(len(self.abbrevs))
+        for col, asset in enumerate(self.portfolio.get_assets()):
+            period, shares_per_period = self.portfolio.get_periodic_asset(asset)
+            if period:
+                bought = self._due_purchases(date, period) * shares_per_period
+                holdings[col] += bought
+                purchases[col] = bought * prices[col]
+
+        day = len(self)
+        self._reserve(day + 1, len(self.abbrevs))
+        self._prices[day, :len(self.abbrevs)] = prices
+        self._holdings[day, :len(self.abbrevs)] = holdings
+        self._purchases[day, :len(self.abbrevs)] = purchases
+        self.dates = self.dates.append(pd.DatetimeIndex([date]))
+        self.cash_flows = np.append(self.cash_flows, purchases.sum())
+        self.values = np.append(self.values, prices @ holdings)
+
+    def refresh(self) -> None:
+        """Append days that arrived in the asset histories since the curve was built."""
+        if not self.abbrevs:
+            return
+
+        # new days continue the total return index from the scale the curve was built with
+        new_data = {}
+        for col, asset in enumerate(self.portfolio.get_assets()):
+            total_return = asset.get_column('Total Return')
+            scale = self.prices[-1, col] / total_return.asof(self.dates[-1])
+            new_data[asset.abbrev] = total_return[total_return.index > self.dates[-1]] * scale
+        new_data = pd.DataFrame(new_data)
+        for date, row in new_data.sort_index().iterrows():
+            self.append_bar(date, row.dropna().to_dict())
+
+    def update_last_day(self) -> None:
+        """Update the value of the last day after prices changed during the day."""
+        self.refresh()
+        if len(self) < 2:
+            return
+
+        for col, asset in enumerate(self.portfolio.get_assets()):
+            if asset.data.last_date() != self.dates[-1]:
+                continue
+            # keep the scale the previous day of the curve has
+            _, previous = asset.data.locate(end_date=self.dates[-2])
+            scale = self.prices[-2, col] / asset.data.total_return[previous - 1]
+            self.prices[-1, col] = asset.data.total_return[-1] * scale
+
+        self.values[-1] = self.prices[-1] @ self.holdings[-1]
+
+    def last_prices(self) -> np.ndarray:
+        if not len(self):
+            return np.empty(0)
+        return self.prices[-1]
+
+    def returns(self) -> np.ndarray:
+        """Daily returns with the money of periodic purchases taken out."""
+        if len(self) < 2:
+            return np.empty(0)
+        return (self.values[1:] - self.cash_flows[1:]) / self.values[:-1] - 1
+
+    def growth(self) -> np.ndarray:
+        """Value of one dollar invested at the start of the curve."""
+        return np.concatenate(([1.0], np.cumprod(1 + self.returns())))
+
+    def drawdown(self) -> np.ndarray:
+        """Relative fall from the highest value reached so far, for every day."""
+        growth = self.growth()
+        return growth / np.maximum.accumulate(growth) - 1
+
+    def volatility(self) -> float:
+        returns = self.returns()
+        if len(returns) < 2:
+            return 0.0
+        return float(np.std(returns, ddof=1) * np.sqrt(TRADING_DAYS))
+
+    def rolling_volatility(self, window: int = 21) -> np.ndarray:
+        """Annualized volatility of every window of daily returns."""
+        return rolling_std(self.returns(), window) * np.sqrt(TRADING_DAYS)
+
+    def sharpe_ratio(self, risk_free_rate: float = 0.0) -> float:
+        """Annualized Sharpe ratio of the daily returns."""
+        excess = self.returns() - risk_free_rate / TRADING_DAYS
+        if len(excess) < 2 or not np.std(excess, ddof=1):
+            return 0.0
+        return float(excess.mean() / np.std(excess, ddof=1) * np.sqrt(TRADING_DAYS))
+
+    def rolling_sharpe_ratio(self, window: int = 252, risk_free_rate: float = 0.0) -> np.ndarray:
+        excess = self.returns() - risk_free_rate / TRADING_DAYS
+        std = rolling_std(excess, window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = rolling_mean(excess, window) / std * np.sqrt(TRADING_DAYS)
+        return np.nan_to_num(sharpe, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def summary(self) -> dict:
+        """Main metrics of the curve."""
+        if not len(self):
+            return {}
+
+        rolling_volatility = self.rolling_volatility()
+        return {
+            'start': self.dates[0],
+            'end': self.dates[-1],
+            'value': self.values[-1],
+            'invested': self.cash_flows.sum(),
+            'total_return': (self.growth()[-1] - 1) * 100,
+            'max_drawdown': self.drawdown().min() * 100,
+            'volatility': self.volatility() * 100,
+            'recent_volatility': (rolling_volatility[-1] if len(rolling_volatility) else 0.0) * 100,
+            'sharpe': self.sharpe_ratio(),
+        }
+
+    def _align(self, asset) -> np.ndarray:
+        """Close prices of an asset adjusted for splits and dividends on the days of the curve."""
+        return asset.get_adjusted_close().reindex(self.dates, method='ffill').to_numpy(dtype=float)
+
+    def _due_purchases(self, date: pd.Timestamp, period: int) -> int:
+        """Count the periodic purchases that became due since the last day of the curve."""
+        previous = (self.dates[-1] - self.dates[0]).days // period
+        return (date - self.dates[0]).days // period - previous
+
+    def _holdings_column(self, asset, close: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Shares held every day and the money spent on periodic purchases every day."""
+        shares = np.full(len(self.dates), float(self.portfolio.static_assets[asset]))
+        purchases = np.zeros(len(self.dates))
+
+        period, shares_per_period = self.portfolio.get_periodic_asset(asset)
+        if not period:
+            return shares, purchases
+
+        # buy on the first trading day on or after every due date
+        days = (self.dates[-1] - self.dates[0]).days
+        due_dates = self.dates[0] + pd.to_timedelta(np.arange(period, days + 1, period), unit='D')
+        bought = np.bincount(self.dates.searchsorted(due_dates), minlength=len(self.dates))[:len(self.dates)]
+        bought = bought * shares_per_period
+
+        return shares + np.cumsum(bought), bought * close
+
+    def _add_column(self, asset) -> None:
+        """Add a new asset to the curve without recalculating the others."""
+        history = asset.get_dates()
+        if not self.abbrevs or history[0] > self.dates[0] \
+                or not history[history >= self.dates[0]].isin(self.dates).all():
+            # the days of the curve change so it is aligned again
+            self.rebuild()
+            return
+
+        close = self._align(asset)
+        shares, purchases = self._holdings_column(asset, close)
+
+        col = len(self.abbrevs)
+        self._reserve(len(self), col + 1)
+        self._prices[:len(self), col] = close
+        self._holdings[:len(self), col] = shares
+        self._purchases[:len(self), col] = purchases
+        self.abbrevs.append(asset.abbrev)
+        self.shares = np.append(self.shares, self.portfolio.static_assets[asset])
+        self.cash_flows += purchases
+        self.values += close * shares
+
+    def _reserve(self, days: int, assets: int) -> None:
+        """Make room for the given number of days and assets, growing the matrices by half at once."""
+        capacity_days, capacity_assets = self._prices.shape
+        if days <= capacity_days and assets <= capacity_assets:
+            return
+
+        shape = (capacity_days if days <= capacity_days else max(days, capacity_days * 3 // 2),
+                 capacity_assets if assets <= capacity_assets else max(assets, capacity_assets * 3 // 2))
+        for name in ('_prices', '_holdings', '_purchases'):
+            matrix = np.zeros(shape)
+            matrix[:len(self), :len(self.abbrevs)] = getattr(self, name)[:len(self), :len(self.abbrevs)]
+            setattr(self, name, matrix)
@@ -1,16 +1,22 @@
 import sys
 
-from PyQt6.QtWidgets import QApplication
-
-from UI.main_menu import MainMenu
 from logic.config import config
 from logic.utils import calc_window_size
 
 
 def main():
    """Enter program."""
+   # imported here because worker processes run this module again when they start, and they must not load
+   # the app, its database and its background threads
+   from PyQt6.QtWidgets import QApplication
+   from logic.shared import warm_pool
+   from UI.main_menu import MainMenu
+
    app = QApplication(sys.argv)
 
+   # worker processes start while the first window is opened
+   warm_pool()
+
    # set window size in config
    config['WINDOW_SIZE'] = calc_window_size(app)
 